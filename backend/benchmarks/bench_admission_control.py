@@ -0,0 +1,82 @@
+"""Outcome of a burst of logo requests with and without admission control.
+
+Fires ``--requests`` concurrent 4-variant generations from ``--clients``
+clients at ``FakeGenerativeModel`` configured to throttle (like Gemini's
+429) above ``--upstream-concurrency`` calls in flight. Without protection
+throttled calls fail their requests ("throttled"); with the token buckets,
+backlog shedding and jittered retries, excess load is shed up front as
+fast 429s with Retry-After ("shed") and admitted requests succeed.
+
+    python benchmarks/bench_admission_control.py --requests 40 --upstream-concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generation  # noqa: E402
+from generation import UpstreamThrottled, generate_variants  # noqa: E402
+from ratelimit import RateLimited, RateLimiter  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from common import percentile  # noqa: E402
+
+
+async def burst(model, limiter, request_count, client_count):
+    # Enough threads that the semaphores, not the executor, bound concurrency
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(64))
+    generation._global_limiter = asyncio.Semaphore(generation.GENERATION_GLOBAL_CONCURRENCY)
+    outcomes = {"ok": 0, "partial": 0, "rejected": 0, "throttled": 0, "failed": 0}
+    latencies = []
+
+    async def one(index):
+        start = time.perf_counter()
+        try:
+            if limiter is not None:
+                limiter.acquire(f"client-{index % client_count}", 4)
+                generation.admit(generation.upstream_calls(model, 4))
+            images, errors = await generate_variants(model, f"logo {index}", 4)
+            outcomes["ok" if not errors else "partial" if images else "failed"] += 1
+        except UpstreamThrottled:
+            outcomes["throttled"] += 1
+        except RateLimited:
+            outcomes["rejected"] += 1
+        except Exception:
+            outcomes["failed"] += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(request_count)))
+    return outcomes, latencies, time.perf_counter() - start
+
+
+def run(request_count, client_count, latency, upstream_concurrency):
+    print(f"{request_count} logo requests from {client_count} clients, fake latency {latency * 1000:.0f} ms, "
+          f"upstream throttles above {upstream_concurrency} calls in flight")
+    print(f"{'mode':<11} {'ok':>4} {'partial':>8} {'shed':>5} {'throttled':>10} {'failed':>7} {'upstream 429s':>14} "
+          f"{'p95 (s)':>8} {'wall (s)':>9}")
+
+    modes = [
+        ("unprotected", None, 0),
+        ("protected", RateLimiter(client_rate=1, client_burst=8, global_rate=upstream_concurrency / latency,
+                                  global_burst=upstream_concurrency * 4), generation.GEMINI_MAX_RETRIES),
+    ]
+    for label, limiter, retries in modes:
+        generation.GEMINI_MAX_RETRIES = retries
+        model = FakeGenerativeModel(latency=latency, max_concurrency=upstream_concurrency)
+        outcomes, latencies, wall = asyncio.run(burst(model, limiter, request_count, client_count))
+        print(f"{label:<11} {outcomes['ok']:>4} {outcomes['partial']:>8} {outcomes['rejected']:>5} "
+              f"{outcomes['throttled']:>10} {outcomes['failed']:>7} {model.throttled:>14} {percentile(latencies, 95):>8.2f} {wall:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--upstream-concurrency", type=int, default=8)
+    args = parser.parse_args()
+    run(args.requests, args.clients, args.latency, args.upstream_concurrency)
@@ -0,0 +1,75 @@
+"""Bulk import and NDJSON export throughput against a running backend.
+
+Imports ``--count`` generated projects through ``POST /api/projects/bulk``
+in chunks, compares the rate with one-at-a-time ``POST /api/projects`` on a
+small sample, then streams ``GET /api/projects/export`` and reports time to
+first byte and lines per second.
+
+    python benchmarks/bench_bulk_projects.py --base-url http://localhost:8001 --count 100000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+from common import make_project
+
+
+def bulk_project(prefix, i, now):
+    return make_project(f"{prefix}-{i}", f"Bulk benchmark {i}", components=1, content="Lorem ipsum", now=now)
+
+
+def run(base_url, count, chunk, sample, keep):
+    prefix = f"bulk-{uuid.uuid4().hex[:8]}"
+    now = datetime.now().isoformat()
+
+    with requests.Session() as session:
+        start = time.perf_counter()
+        for i in range(sample):
+            session.post(f"{base_url}/api/projects", json=bulk_project(prefix + "-single", i, now)).raise_for_status()
+        single_elapsed = time.perf_counter() - start
+
+        written = failed = 0
+        start = time.perf_counter()
+        for offset in range(0, count, chunk):
+            projects = [bulk_project(prefix, i, now) for i in range(offset, min(offset + chunk, count))]
+            response = session.post(f"{base_url}/api/projects/bulk", json={"projects": projects})
+            response.raise_for_status()
+            written += response.json()["written"]
+            failed += response.json()["failed"]
+        bulk_elapsed = time.perf_counter() - start
+
+        lines = size = 0
+        first_byte = None
+        start = time.perf_counter()
+        with session.get(f"{base_url}/api/projects/export", stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                lines += 1
+                size += len(line) + 1
+        export_elapsed = time.perf_counter() - start
+
+        if not keep:
+            for project_id in [f"{prefix}-single-{i}" for i in range(sample)] + [f"{prefix}-{i}" for i in range(count)]:
+                session.delete(f"{base_url}/api/projects/{project_id}")
+
+    print(f"single POST  {sample / single_elapsed:>10.0f} projects/s  ({sample} projects)")
+    print(f"bulk import  {written / bulk_elapsed:>10.0f} projects/s  ({written} written, {failed} failed, "
+          f"chunks of {chunk})")
+    print(f"export       {lines / export_elapsed:>10.0f} lines/s     ({lines} lines, {size / 1e6:.1f} MB, "
+          f"first byte {(first_byte or 0) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=500, help="projects created one at a time for comparison")
+    parser.add_argument("--keep", action="store_true", help="leave the generated projects in place")
+    args = parser.parse_args()
+    run(args.base_url, args.count, args.chunk, args.sample, args.keep)
@@ -0,0 +1,43 @@
+"""Per-request client overhead before and after the client registry.
+
+Compares building ``genai.GenerativeModel`` per simulated request (the
+old path) with a registry lookup of a model built once at startup.
+
+No Gemini key or network access is needed.
+
+    python benchmarks/bench_client_reuse.py --iterations 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai  # noqa: E402
+from clients import ClientRegistry  # noqa: E402
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations):
+    genai.configure(api_key="benchmark-key")
+    registry = ClientRegistry(model_factory=genai.GenerativeModel)
+    registry.model()
+
+    before = per_call_us(lambda: genai.GenerativeModel("gemini-1.5-flash"), iterations)
+    after = per_call_us(lambda: registry.model("gemini-1.5-flash"), iterations)
+    registry.close()
+    print(f"model per request   {before:9.1f} us -> registry {after:9.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.iterations)
@@ -0,0 +1,114 @@
+"""Cold-start time of the production entry point.
+
+First profiles ``import server`` with ``python -X importtime`` and lists
+the heaviest top-level packages; the Gemini SDK and PIL must not be among
+them, they are loaded on first use. Then starts ``serve.py`` in a
+subprocess and polls the liveness and readiness endpoints, reporting how
+long until the first worker answers each. Exits non-zero when the import
+takes longer than ``--import-budget`` milliseconds or readiness longer
+than ``--target`` seconds, so it can gate a deploy.
+
+    python benchmarks/bench_cold_start.py --workers 4 --target 5 --import-budget 800
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use; importing the app must not pull them in
+LAZY_MODULES = ("google.generativeai", "google.api_core", "PIL", "requests")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_profile():
+    """``[(module, cumulative_us, depth)]`` for ``import server``, in the
+    order ``-X importtime`` reports them: every module after its imports.
+    Modules loaded by interpreter startup are left out.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            if match.group(3) == "" and match.group(4) != "server":
+                modules = []
+            else:
+                modules.append((match.group(4), int(match.group(2)), len(match.group(3)) // 2))
+    return modules
+
+
+def run_import(budget, top):
+    modules = import_profile()
+    total = modules[-1][1] / 1000
+    packages = sorted(((cumulative, name) for name, cumulative, depth in modules if depth == 1), reverse=True)
+    print(f"import server {total:8.1f} ms (budget {budget:.0f} ms)")
+    for cumulative, name in packages[:top]:
+        print(f"  {name:<24} {cumulative / 1000:8.1f} ms")
+    names = {name for name, _, _ in modules}
+    eager = [name for name in LAZY_MODULES if name in names]
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+    return total <= budget and not eager
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def run(workers, target, timeout):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}/api"
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY=str(workers))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        live = wait_for(f"{base_url}/health/live", deadline)
+        live_time = time.perf_counter() - start
+        ready = live and wait_for(f"{base_url}/health/ready", deadline)
+        ready_time = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    print(f"{workers} workers")
+    print(f"live   {live_time:6.2f} s" if live else f"live   not reached in {timeout:.0f} s")
+    print(f"ready  {ready_time:6.2f} s (target {target:.1f} s)" if ready else f"ready  not reached in {timeout:.0f} s")
+    return ready and ready_time <= target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--target", type=float, default=5.0, help="seconds until ready")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--import-budget", type=float, default=1000.0, help="milliseconds to import server")
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list")
+    args = parser.parse_args()
+    imported = run_import(args.import_budget, args.top)
+    print()
+    ready = run(args.workers, args.target, args.timeout)
+    sys.exit(0 if imported and ready else 1)
@@ -0,0 +1,159 @@
+"""Write amplification and latency of live editing against per-save PUT.
+
+Replays the same ``--edits`` component edits twice against a running
+backend: once as a full-document ``PUT`` per edit, the way the builder
+saves today, and once as operations over the live editing WebSocket from
+``--editors`` connected clients. Edits are paced at ``--rate`` per second
+so the write-behind timer behaves as it would with people typing.
+MongoDB writes are read from ``/api/metrics``, so the backend must be
+connected to a real mongod for those columns.
+
+    python benchmarks/bench_collab.py --base-url http://localhost:8001 --edits 300 --rate 20
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+import requests
+from websockets.sync.client import connect
+
+from common import make_project, percentile
+
+WRITE_COMMANDS = {"insert", "update", "findAndModify", "delete"}
+METRIC_RE = re.compile(r'^mongo_operation_duration_seconds_count\{collection="(\w*)",operation="(\w+)"\} (\d+)$')
+
+
+def mongo_writes(session, base_url):
+    writes = {}
+    for line in session.get(f"{base_url}/api/metrics").text.splitlines():
+        match = METRIC_RE.match(line)
+        if match and match.group(2) in WRITE_COMMANDS:
+            writes[match.group(1)] = writes.get(match.group(1), 0) + int(match.group(3))
+    return writes
+
+
+def writes_since(before, after):
+    return {collection: after.get(collection, 0) - before.get(collection, 0) for collection in after}
+
+
+def edits(project, count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        component = rng.choice(project["components"])
+        yield component, {"props": {**component["props"], "content": f"Edit {i} " + "typing " * (i % 20)}}
+
+
+def pace(start, index, rate):
+    delay = start + index / rate - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def run_put(session, base_url, project, count, rate, seed):
+    url = f"{base_url}/api/projects/{project['project_id']}"
+    latencies, sent = [], 0
+    start = time.perf_counter()
+    for i, (component, fields) in enumerate(edits(project, count, seed)):
+        pace(start, i, rate)
+        component.update(fields)
+        body = json.dumps(project)
+        sent += len(body)
+        began = time.perf_counter()
+        session.put(url, data=body, headers={"Content-Type": "application/json"}).raise_for_status()
+        latencies.append(time.perf_counter() - began)
+    return {"ack": latencies, "durable": latencies, "sent": sent}
+
+
+def run_live(base_url, project, count, rate, seed, editor_count):
+    url = base_url.replace("http", "ws", 1) + f"/api/projects/{project['project_id']}/live"
+    editors = [connect(url) for _ in range(editor_count)]
+    acks, fanout, durable, sent = [], [], [], 0
+    unsaved = {}  # seq -> when its edit was sent
+
+    def settle(reply):
+        # A "saved" message covers every seq up to its own
+        if reply["type"] == "saved":
+            now = time.perf_counter()
+            for seq in [seq for seq in unsaved if seq <= reply["seq"]]:
+                durable.append(now - unsaved.pop(seq))
+        return reply
+
+    def receive(editor):
+        # "saved" can arrive between any two messages
+        while True:
+            reply = settle(json.loads(editor.recv()))
+            if reply["type"] != "saved":
+                return reply
+
+    try:
+        for editor in editors:
+            assert receive(editor)["type"] == "hello"
+        start = time.perf_counter()
+        for i, (component, fields) in enumerate(edits(project, count, seed)):
+            pace(start, i, rate)
+            sender = editors[i % editor_count]
+            message = json.dumps({"type": "ops", "client_seq": i,
+                                  "operations": [{"op": "update", "id": component["id"], "fields": fields}]})
+            sent += len(message)
+            began = time.perf_counter()
+            sender.send(message)
+            for editor in editors:
+                reply = receive(editor)
+                if editor is sender:
+                    last_seq = reply["seq"]
+                    unsaved[last_seq] = began
+                    acks.append(time.perf_counter() - began)
+                else:
+                    fanout.append(time.perf_counter() - began)
+        # Wait for the write-behind timer; every editor is told when the last edit is saved
+        for editor in editors:
+            while True:
+                reply = settle(json.loads(editor.recv()))
+                if reply["type"] == "saved" and reply["seq"] == last_seq:
+                    break
+    finally:
+        for editor in editors:
+            editor.close()
+    return {"ack": acks, "fanout": fanout, "durable": durable, "sent": sent}
+
+
+def report(name, result, writes, count):
+    total = sum(writes.values())
+    detail = ", ".join(f"{collection or '?'} {value}" for collection, value in sorted(writes.items()) if value)
+    print(f"{name:<6} writes {total:6d} ({total / count:5.2f}/edit: {detail or 'no mongo metrics'})"
+          f"   sent {result['sent'] / count / 1024:7.2f} KiB/edit")
+    for label in ("ack", "fanout", "durable"):
+        samples = result.get(label)
+        if samples:
+            print(f"       {label:<8} p50 {percentile(samples, 50) * 1000:8.2f} ms   "
+                  f"p95 {percentile(samples, 95) * 1000:8.2f} ms   p99 {percentile(samples, 99) * 1000:8.2f} ms")
+
+
+def run(args):
+    with requests.Session() as session:
+        for name in ("put", "live"):
+            project = make_project(name="Live editing benchmark", components=args.components,
+                                   content="Lorem ipsum dolor sit amet " * 4)
+            session.post(f"{args.base_url}/api/projects", json=project).raise_for_status()
+            try:
+                before = mongo_writes(session, args.base_url)
+                if name == "put":
+                    result = run_put(session, args.base_url, project, args.edits, args.rate, args.seed)
+                else:
+                    result = run_live(args.base_url, project, args.edits, args.rate, args.seed, args.editors)
+                report(name, result, writes_since(before, mongo_writes(session, args.base_url)), args.edits)
+            finally:
+                session.delete(f"{args.base_url}/api/projects/{project['project_id']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--edits", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=20, help="edits per second")
+    parser.add_argument("--editors", type=int, default=3)
+    parser.add_argument("--components", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
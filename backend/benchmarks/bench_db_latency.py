@@ -0,0 +1,94 @@
+"""Read latency under a concurrent large list query.
+
+Seeds a running backend with large projects, keeps ``GET /api/projects``
+busy in the background and measures ``GET /api/projects/{id}`` latency
+from concurrent clients. With a blocking driver the point reads queue up
+behind the list query; with the async data layer p99 should stay close
+to p50.
+
+    python benchmarks/bench_db_latency.py --base-url http://localhost:8001
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from common import make_project, percentile
+
+
+def seed_projects(base_url, count, components_per_project):
+    project_ids = []
+    now = datetime.now().isoformat()
+    with requests.Session() as session:
+        for i in range(count):
+            project = make_project(name=f"Benchmark project {i}", components=components_per_project,
+                                   content="x" * 200, now=now)
+            session.post(f"{base_url}/api/projects", json=project).raise_for_status()
+            project_ids.append(project["project_id"])
+    return project_ids
+
+
+def cleanup_projects(base_url, project_ids):
+    with requests.Session() as session:
+        for project_id in project_ids:
+            session.delete(f"{base_url}/api/projects/{project_id}")
+
+
+def run(base_url, project_count, components, readers, reads_per_reader):
+    print(f"Seeding {project_count} projects with {components} components each...")
+    project_ids = seed_projects(base_url, project_count, components)
+
+    stop = threading.Event()
+    list_durations = []
+
+    def list_loop():
+        with requests.Session() as session:
+            while not stop.is_set():
+                start = time.perf_counter()
+                session.get(f"{base_url}/api/projects").raise_for_status()
+                list_durations.append(time.perf_counter() - start)
+
+    def reader(worker_index):
+        samples = []
+        with requests.Session() as session:
+            for i in range(reads_per_reader):
+                project_id = project_ids[(worker_index + i) % len(project_ids)]
+                start = time.perf_counter()
+                session.get(f"{base_url}/api/projects/{project_id}").raise_for_status()
+                samples.append(time.perf_counter() - start)
+        return samples
+
+    try:
+        lister = threading.Thread(target=list_loop, daemon=True)
+        lister.start()
+        with ThreadPoolExecutor(max_workers=readers) as pool:
+            results = pool.map(reader, range(readers))
+            latencies = [sample for samples in results for sample in samples]
+        stop.set()
+        lister.join()
+    finally:
+        cleanup_projects(base_url, project_ids)
+
+    print(f"\nGET /api/projects/{{id}} x {len(latencies)} ({readers} concurrent readers)")
+    print(f"  p50: {percentile(latencies, 50) * 1000:8.2f} ms")
+    print(f"  p95: {percentile(latencies, 95) * 1000:8.2f} ms")
+    print(f"  p99: {percentile(latencies, 99) * 1000:8.2f} ms")
+    print(f"  max: {max(latencies) * 1000:8.2f} ms")
+    if list_durations:
+        print(f"GET /api/projects x {len(list_durations)} in background, "
+              f"mean {statistics.mean(list_durations) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--components", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+    run(args.base_url, args.projects, args.components, args.readers, args.reads)
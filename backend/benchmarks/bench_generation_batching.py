@@ -0,0 +1,87 @@
+"""Upstream calls and latency of multi-candidate generation.
+
+Generates ``count`` variants against ``FakeGenerativeModel``, which counts
+its calls, in three setups: one call per variant (the previous
+behaviour), ``candidate_count`` batching on a model that supports it, and
+a model that rejects it, where the backend falls back to single calls
+after the first rejection. A burst of identical concurrent requests then
+shows what coalescing in-flight generations saves.
+
+    python benchmarks/bench_generation_batching.py --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generation  # noqa: E402
+from generation import GenerationBackend, coalesce, generate_variants  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+
+SETUPS = {
+    # label: (candidates the fake accepts, candidates the backend asks for)
+    "per-variant": (8, 1),
+    "candidates": (8, generation.GEMINI_MAX_CANDIDATES),
+    "fallback": (1, generation.GEMINI_MAX_CANDIDATES),
+}
+
+
+async def generate(model, count, repeat):
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(64))
+    generation._global_limiter = asyncio.Semaphore(generation.GENERATION_GLOBAL_CONCURRENCY)
+    latencies, images = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result, _ = await generate_variants(model, "benchmark prompt", count)
+        latencies.append(time.perf_counter() - start)
+        images += len(result)
+    return latencies, images
+
+
+async def burst(model, requests, count):
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(64))
+    generation._global_limiter = asyncio.Semaphore(generation.GENERATION_GLOBAL_CONCURRENCY)
+
+    async def one(shared):
+        if shared:
+            return await coalesce("benchmark", lambda: generate_variants(model, "benchmark prompt", count))
+        return await generate_variants(model, "benchmark prompt", count)
+
+    results = {}
+    for shared in (False, True):
+        before = model.calls
+        start = time.perf_counter()
+        await asyncio.gather(*(one(shared) for _ in range(requests)))
+        results["coalesced" if shared else "independent"] = (model.calls - before, time.perf_counter() - start)
+    return results
+
+
+def run(latency, counts, repeat, burst_size):
+    print(f"fake latency {latency * 1000:.0f} ms per call, {repeat} requests per row")
+    print(f"{'setup':<12} {'count':>5} {'calls/req':>10} {'images/req':>11} {'mean (s)':>9} {'max (s)':>8}")
+    for count in counts:
+        for label, (accepted, requested) in SETUPS.items():
+            model = FakeGenerativeModel(latency=latency, max_candidates=accepted)
+            generation._backends[model] = GenerationBackend(model, requested)
+            latencies, images = asyncio.run(generate(model, count, repeat))
+            print(f"{label:<12} {count:>5} {model.calls / repeat:>10.2f} {images / repeat:>11.1f} "
+                  f"{sum(latencies) / len(latencies):>9.3f} {max(latencies):>8.3f}")
+
+    model = FakeGenerativeModel(latency=latency)
+    print(f"\n{burst_size} identical concurrent 4-variant requests")
+    for label, (calls, wall) in asyncio.run(burst(model, burst_size, 4)).items():
+        print(f"{label:<12} {calls:>5} upstream calls {wall:>8.3f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--burst", type=int, default=20)
+    args = parser.parse_args()
+    run(args.latency, args.counts, args.repeat, args.burst)
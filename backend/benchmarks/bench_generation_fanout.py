@@ -0,0 +1,50 @@
+"""Wall time of multi-variant generation, serial vs. concurrent fan-out.
+
+Runs against ``FakeGenerativeModel`` so no Gemini key or network is needed.
+
+    python benchmarks/bench_generation_fanout.py --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generation import IMAGE_GENERATION_CONFIG, extract_images, generate_variants  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+
+
+def serial(model, prompt, count):
+    images = []
+    for _ in range(count):
+        response = model.generate_content(prompt, generation_config=IMAGE_GENERATION_CONFIG)
+        images.extend(extract_images(response))
+    return images
+
+
+def run(latency, counts, failure_rate):
+    print(f"fake latency {latency * 1000:.0f} ms per call, failure rate {failure_rate:.0%}")
+    print(f"{'count':>5} {'serial (s)':>11} {'fan-out (s)':>12} {'speedup':>8} {'images':>7} {'errors':>7}")
+    for count in counts:
+        start = time.perf_counter()
+        serial(FakeGenerativeModel(latency=latency), "benchmark prompt", count)
+        serial_time = time.perf_counter() - start
+
+        model = FakeGenerativeModel(latency=latency, failure_rate=failure_rate)
+        start = time.perf_counter()
+        images, errors = asyncio.run(generate_variants(model, "benchmark prompt", count))
+        fanout_time = time.perf_counter() - start
+
+        print(f"{count:>5} {serial_time:>11.3f} {fanout_time:>12.3f} "
+              f"{serial_time / fanout_time:>7.1f}x {len(images):>7} {len(errors):>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    run(args.latency, args.counts, args.failure_rate)
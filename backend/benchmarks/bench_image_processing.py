@@ -0,0 +1,76 @@
+"""Output size and throughput of the image post-processing stage.
+
+Reports encoded size for PNG as generated, optimized PNG and WebP, then
+runs ``process_image`` over a batch in process pools of increasing size
+and reports images/s overall and per worker.
+
+    python benchmarks/bench_image_processing.py --size 1024 --images 32
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from imaging import process_image  # noqa: E402
+
+
+def make_logo(size, seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (size, size), (250, 250, 250))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(size), rng.randrange(size)
+        r = rng.randrange(size // 20, size // 4)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run(size, count, max_workers):
+    images = [make_logo(size, seed) for seed in range(count)]
+    source = sum(len(image) for image in images) / count
+
+    print(f"{count} images, {size}x{size} px")
+    print(f"{'output':28} {'avg bytes':>10} {'vs source':>9}")
+    print(f"{'png (as generated)':28} {source:>10.0f} {1:>8.2f}x")
+    variants = [
+        ("png optimized", {"format": "png"}),
+        ("webp q85", {"format": "webp", "quality": 85}),
+        (f"webp q85 {size // 2}px", {"format": "webp", "quality": 85, "width": size // 2}),
+    ]
+    for label, options in variants:
+        sizes = [len(process_image(image, **options)[0]) for image in images[:4]]
+        average = sum(sizes) / len(sizes)
+        print(f"{label:28} {average:>10.0f} {average / source:>8.2f}x")
+
+    print(f"\nwebp q85 throughput ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>7} {'images/s':>9} {'per worker':>11}")
+    workers = 1
+    while workers <= max_workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # Warm the workers up so spawn time is not measured
+            list(pool.map(partial(process_image, format="webp"), images[:workers]))
+            start = time.perf_counter()
+            list(pool.map(partial(process_image, format="webp", quality=85), images))
+            elapsed = time.perf_counter() - start
+        print(f"{workers:>7} {count / elapsed:>9.1f} {count / elapsed / workers:>11.1f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.size, args.images, args.max_workers)
@@ -0,0 +1,69 @@
+"""Bytes sent and write latency: PATCH operations vs. whole-document PUT.
+
+Creates a project with many components on a running backend, then applies
+the same single-component edit repeatedly through ``PUT`` (full document)
+and through ``PATCH`` (one ``update`` operation).
+
+    python benchmarks/bench_project_patch.py --base-url http://localhost:8001 --components 500
+"""
+import argparse
+import json
+import time
+
+import requests
+
+from common import make_project, percentile
+
+
+def report(label, payload_sizes, latencies):
+    print(f"{label:6} bytes/edit {sum(payload_sizes) / len(payload_sizes):>10.0f}   "
+          f"p50 {percentile(latencies, 50) * 1000:7.2f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+
+def run(base_url, component_count, edits):
+    project = make_project(name="Patch benchmark", components=component_count,
+                           content="Lorem ipsum dolor sit amet " * 4)
+    url = f"{base_url}/api/projects/{project['project_id']}"
+
+    with requests.Session() as session:
+        session.post(f"{base_url}/api/projects", json=project).raise_for_status()
+        try:
+            put_sizes, put_latencies = [], []
+            for i in range(edits):
+                project["components"][i % component_count]["position"] = {"x": i, "y": i}
+                body = json.dumps(project)
+                start = time.perf_counter()
+                session.put(url, data=body, headers={"Content-Type": "application/json"}).raise_for_status()
+                put_latencies.append(time.perf_counter() - start)
+                put_sizes.append(len(body))
+
+            version = session.get(url).json()["version"]
+            patch_sizes, patch_latencies = [], []
+            for i in range(edits):
+                component = project["components"][i % component_count]
+                body = json.dumps({
+                    "version": version,
+                    "operations": [{"op": "update", "id": component["id"], "fields": {"position": {"x": i, "y": i}}}],
+                })
+                start = time.perf_counter()
+                response = session.patch(url, data=body, headers={"Content-Type": "application/json"})
+                patch_latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                version = response.json()["version"]
+                patch_sizes.append(len(body))
+        finally:
+            session.delete(url)
+
+    print(f"{component_count} components, {edits} single-component edits")
+    report("PUT", put_sizes, put_latencies)
+    report("PATCH", patch_sizes, patch_latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--components", type=int, default=500)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+    run(args.base_url, args.components, args.edits)
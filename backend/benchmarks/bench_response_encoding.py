@@ -0,0 +1,84 @@
+"""Bytes on wire and serialization time for a 4-logo generate-logo response.
+
+Compares stdlib json vs. orjson, gzip and brotli on top of JSON, and the
+multipart/mixed binary mode. Logos are synthetic PNGs with some noise so
+they compress like real generated images.
+
+    python benchmarks/bench_response_encoding.py --size 512
+"""
+import argparse
+import base64
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import orjson
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multipart_mixed import multipart_response  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_logo(size, seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (size, size), (255, 255, 255))
+    pixels = image.load()
+    for _ in range(size * size // 4):
+        pixels[rng.randrange(size), rng.randrange(size)] = (rng.randrange(256), rng.randrange(256), 80)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def run(size, repeat):
+    logos = [make_logo(size, seed) for seed in range(4)]
+    data_urls = [f"data:image/png;base64,{base64.b64encode(logo).decode('utf-8')}" for logo in logos]
+    payload = {"logos": data_urls, "prompt": "Create a modern professional logo", "errors": [], "cached": False}
+    raw_bytes = sum(len(logo) for logo in logos)
+
+    rows = []
+    body, ms = timed(lambda: json.dumps(payload).encode("utf-8"), repeat)
+    rows.append(("json (stdlib)", len(body), ms))
+    body, ms = timed(lambda: orjson.dumps(payload), repeat)
+    rows.append(("orjson", len(body), ms))
+    orjson_ms = ms
+    compressed, ms = timed(lambda: gzip.compress(body, compresslevel=6), repeat)
+    rows.append(("orjson + gzip-6", len(compressed), orjson_ms + ms))
+    if brotli is not None:
+        compressed, ms = timed(lambda: brotli.compress(body, quality=4), repeat)
+        rows.append(("orjson + br-4", len(compressed), orjson_ms + ms))
+    response, ms = timed(lambda: multipart_response(
+        {"prompt": payload["prompt"], "errors": [], "cached": False},
+        [(f"logo-{i}", logo) for i, logo in enumerate(logos)],
+    ), repeat)
+    rows.append(("multipart/mixed", len(response.body), ms))
+
+    print(f"4 logos, {size}x{size} px, {raw_bytes / 1024:.0f} KiB of raw PNG")
+    print(f"{'encoding':18} {'bytes':>10} {'vs raw':>7} {'time (ms)':>10}")
+    for name, length, ms in rows:
+        print(f"{name:18} {length:>10} {length / raw_bytes:>6.2f}x {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.size, args.repeat)
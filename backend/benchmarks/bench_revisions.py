@@ -0,0 +1,75 @@
+"""Revision history storage and reconstruction latency.
+
+Saves a project ``--revisions`` times through ``PUT`` (each save edits one
+component and occasionally adds one), then reports the stored history size
+against full snapshots and the latency of reconstructing random revisions.
+Start the backend with ``REVISION_RETENTION`` at least ``--revisions`` to
+keep the whole history.
+
+    python benchmarks/bench_revisions.py --base-url http://localhost:8001 --revisions 2000
+"""
+import argparse
+import random
+import time
+import uuid
+
+import requests
+
+from common import make_project, percentile
+
+
+def run(base_url, component_count, revisions, samples):
+    project = make_project(name="Revision benchmark", components=component_count,
+                           content="Lorem ipsum dolor sit amet " * 4)
+    url = f"{base_url}/api/projects/{project['project_id']}"
+    rng = random.Random(1)
+
+    with requests.Session() as session:
+        session.post(f"{base_url}/api/projects", json=project).raise_for_status()
+        try:
+            start = time.perf_counter()
+            for i in range(revisions):
+                rng.choice(project["components"])["props"]["content"] = f"Edit {i}"
+                if i % 50 == 0:
+                    project["components"].append(
+                        {"id": str(uuid.uuid4()), "type": "heading", "position": {"x": 0, "y": 0},
+                         "props": {"content": f"Added {i}", "level": 2}, "styles": {}})
+                session.put(url, json=project).raise_for_status()
+            save_time = (time.perf_counter() - start) / revisions
+
+            history, before = [], None
+            while True:
+                params = {"limit": 200, **({"before": before} if before is not None else {})}
+                page = session.get(f"{url}/revisions", params=params).json()
+                history.extend(page["revisions"])
+                before = page["next_before"]
+                if before is None:
+                    break
+
+            versions = [revision["version"] for revision in history]
+            latencies = []
+            for version in rng.sample(versions, min(samples, len(versions))):
+                start = time.perf_counter()
+                session.get(f"{url}/revisions/{version}").raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        finally:
+            session.delete(url)
+
+    stored = sum(revision["size"] for revision in history)
+    snapshots = sum(revision["kind"] == "snapshot" for revision in history)
+    full = len(repr(project["components"])) * len(history)
+    print(f"{component_count} components, {revisions} saves, {len(history)} revisions kept ({snapshots} snapshots)")
+    print(f"save          {save_time * 1000:8.2f} ms/PUT")
+    print(f"history size  {stored / 1e6:8.2f} MB  (full snapshots {full / 1e6:.2f} MB, {full / stored:.0f}x)")
+    print(f"reconstruct   p50 {percentile(latencies, 50) * 1000:7.2f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:7.2f} ms   p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--components", type=int, default=200)
+    parser.add_argument("--revisions", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+    run(args.base_url, args.components, args.revisions, args.samples)
@@ -0,0 +1,104 @@
+"""Project search latency at scale against a running backend.
+
+Imports ``--count`` projects with generated names and component text
+through the bulk endpoint, then times ``GET /api/projects/search`` for
+common, rare, multi-word and phrase queries and for a deep page reached
+through the cursor. The existing ``GET /api/projects?name=`` substring
+filter, the only way to look projects up before, is timed for comparison.
+The backend needs a real mongod; mongomock has no ``$text``.
+
+    python benchmarks/bench_search.py --base-url http://localhost:8001 --count 100000
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+from common import make_project, percentile
+
+# A Zipf-ish vocabulary: a few words are everywhere, most are rare
+COMMON = ["landing", "page", "coffee", "studio", "portfolio", "shop", "agency", "blog"]
+WORDS = COMMON + [f"term{i}" for i in range(5000)]
+
+
+def phrase(rng, length):
+    return " ".join(rng.choice(COMMON) if rng.random() < 0.3 else rng.choice(WORDS) for _ in range(length))
+
+
+def search_project(prefix, i, rng, now):
+    project = make_project(f"{prefix}-{i}", phrase(rng, 3).title(), components=3, now=now)
+    for component in project["components"]:
+        component["props"]["content"] = phrase(rng, 12)
+    return project
+
+
+def timed(session, samples, url, params):
+    start = time.perf_counter()
+    response = session.get(url, params=params)
+    samples.append(time.perf_counter() - start)
+    response.raise_for_status()
+    return response.json()
+
+
+def run(base_url, count, chunk, repeat, keep):
+    prefix = f"search-{uuid.uuid4().hex[:8]}"
+    now = datetime.now().isoformat()
+    rng = random.Random(1)
+    search_url = f"{base_url}/api/projects/search"
+
+    with requests.Session() as session:
+        start = time.perf_counter()
+        for offset in range(0, count, chunk):
+            projects = [search_project(prefix, i, rng, now) for i in range(offset, min(offset + chunk, count))]
+            session.post(f"{base_url}/api/projects/bulk", json={"projects": projects}).raise_for_status()
+        print(f"imported {count} projects in {time.perf_counter() - start:.1f} s")
+
+        cases = {
+            "common word": (search_url, lambda: {"q": rng.choice(COMMON)}),
+            "rare word": (search_url, lambda: {"q": f"term{rng.randrange(5000)}"}),
+            "two words": (search_url, lambda: {"q": f"{rng.choice(COMMON)} term{rng.randrange(5000)}"}),
+            "phrase": (search_url, lambda: {"q": f'"{rng.choice(COMMON)} {rng.choice(COMMON)}"'}),
+            "name= regex": (f"{base_url}/api/projects",
+                            lambda: {"name": rng.choice(COMMON), "fields": "project_id,name,updated_at"}),
+        }
+        results = {}
+        try:
+            for label, (url, params) in cases.items():
+                samples = []
+                for _ in range(repeat):
+                    timed(session, samples, url, {**params(), "limit": 20})
+                results[label] = samples
+
+            # Page 10 of a common word, fetched through the cursor chain
+            samples = []
+            for _ in range(max(1, repeat // 10)):
+                params, page_samples = {"q": rng.choice(COMMON), "limit": 20}, []
+                for _ in range(10):
+                    page = timed(session, page_samples, search_url, params)
+                    if not page["next_cursor"]:
+                        break
+                    params["cursor"] = page["next_cursor"]
+                samples.append(page_samples[-1])
+            results["page 10"] = samples
+        finally:
+            if not keep:
+                for i in range(count):
+                    session.delete(f"{base_url}/api/projects/{prefix}-{i}")
+
+    for label, samples in results.items():
+        print(f"{label:<12} p50 {percentile(samples, 50) * 1000:8.2f} ms   "
+              f"p95 {percentile(samples, 95) * 1000:8.2f} ms   p99 {percentile(samples, 99) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=100, help="requests per query kind")
+    parser.add_argument("--keep", action="store_true", help="leave the generated projects in place")
+    args = parser.parse_args()
+    run(args.base_url, args.count, args.chunk, args.repeat, args.keep)
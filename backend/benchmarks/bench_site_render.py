@@ -0,0 +1,85 @@
+"""Static site rendering cost, cold vs. cached, and output size.
+
+Renders a generated project with ``SiteRenderer`` (images go to a
+temporary blob store) and compares the document with the inline-style
+markup the builder's client-side export produces.
+
+    python benchmarks/bench_site_render.py --components 200 --images 10
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blobstore import LocalBlobStore  # noqa: E402
+from site_renderer import SiteRenderer, declarations, site_cache_key  # noqa: E402
+from generation_cache import MemoryTier  # noqa: E402
+from fake_gemini import PNG_BYTES  # noqa: E402
+
+COMPONENT_STYLES = {
+    "text": {"padding": "16px", "margin": "8px", "borderRadius": "8px", "fontSize": "16px", "color": "#374151"},
+    "heading": {"padding": "16px", "margin": "8px", "fontSize": "32px", "fontWeight": "bold", "color": "#1f2937"},
+    "button": {"backgroundColor": "#0ea5e9", "color": "white", "border": "none", "padding": "12px 24px"},
+}
+
+
+def make_project(component_count, image_count):
+    image = "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode()
+    kinds = list(COMPONENT_STYLES)
+    components = [
+        {"id": str(i), "type": kinds[i % len(kinds)], "position": {"x": 0, "y": 0},
+         "props": {"content": f"Component {i}", "text": f"Button {i}", "level": 2, "tag": "p", "link": "#"},
+         "styles": COMPONENT_STYLES[kinds[i % len(kinds)]]}
+        for i in range(component_count)
+    ]
+    components += [
+        {"id": f"img-{i}", "type": "image", "position": {"x": 0, "y": 0},
+         "props": {"src": image, "alt": "image"}, "styles": {"maxWidth": "100%"}}
+        for i in range(image_count)
+    ]
+    return {"project_id": "bench", "name": "Benchmark", "version": 1, "updated_at": "now", "components": components}
+
+
+def inline_size(project):
+    # Roughly what the client-side export emits: one inline style per component
+    size = 0
+    for component in project["components"]:
+        size += len(f'<div class="component" style="{declarations(component["styles"])}"></div>')
+        size += len(component["props"].get("src", "")) + len(component["props"].get("content", ""))
+    return size
+
+
+def run(component_count, image_count, repeats):
+    project = make_project(component_count, image_count)
+    with tempfile.TemporaryDirectory() as root:
+        renderer = SiteRenderer(LocalBlobStore(root))
+        cache = MemoryTier(16, 64 * 1024 * 1024, 3600, sizeof=len)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            html = renderer.render(project)
+        cold = (time.perf_counter() - start) / repeats
+        cache.set(site_cache_key(project), html)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            cache.get(site_cache_key(project))
+        cached = (time.perf_counter() - start) / repeats
+
+    print(f"{component_count} components, {image_count} data-URL images")
+    print(f"render   {cold * 1000:9.3f} ms")
+    print(f"cached   {cached * 1000:9.3f} ms")
+    print(f"html     {len(html):9d} bytes (inline-style export ~{inline_size(project)} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--components", type=int, default=200)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    run(args.components, args.images, args.repeats)
@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts."""
+import uuid
+from datetime import datetime
+
+
+def percentile(samples, pct):
+    """Nearest-rank ``pct`` percentile of ``samples``, 0.0 when empty."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_project(project_id=None, name="Benchmark project", components=20,
+                 content="Lorem ipsum dolor sit amet", now=None):
+    """A project with ``components`` styled text components."""
+    now = now or datetime.now().isoformat()
+    return {
+        "project_id": project_id or f"bench-{uuid.uuid4()}",
+        "name": name,
+        "components": [
+            {"id": str(uuid.uuid4()), "type": "text", "position": {"x": i, "y": i},
+             "props": {"content": content, "tag": "p"},
+             "styles": {"fontSize": "16px", "color": "#374151"}}
+            for i in range(components)
+        ],
+        "created_at": now,
+        "updated_at": now,
+    }
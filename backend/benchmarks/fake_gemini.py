@@ -0,0 +1,63 @@
+"""Deterministic stand-in for ``genai.GenerativeModel`` used by benchmarks.
+
+Mirrors the response shape the backend reads
+(``response.candidates[c].content.parts[i].inline_data.data``), honours
+``candidate_count`` up to ``max_candidates`` and blocks for a fixed
+latency like the real client does.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as google_exceptions
+
+# 1x1 transparent PNG, as written by Image.new("RGBA", (1, 1), (0, 0, 0, 0)).save(..., "PNG")
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360606060000000050001a5f645400000000049454e44ae426082"
+)
+
+
+def make_response(image_bytes=PNG_BYTES, images=1, candidates=1):
+    def candidate():
+        parts = [SimpleNamespace(inline_data=SimpleNamespace(mime_type="image/png", data=image_bytes))
+                 for _ in range(images)]
+        return SimpleNamespace(content=SimpleNamespace(parts=parts))
+    return SimpleNamespace(candidates=[candidate() for _ in range(candidates)])
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name="gemini-1.5-flash", latency=0.5, failure_rate=0.0, max_concurrency=None,
+                 max_candidates=8):
+        self.model_name = model_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        # Larger candidate_count values are rejected; 1 means unsupported
+        self.max_candidates = max_candidates
+        # Calls beyond this many in flight are rejected like Gemini's 429
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.throttled = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        candidates = (generation_config or {}).get("candidate_count", 1)
+        with self._lock:
+            self.calls += 1
+            if candidates > self.max_candidates:
+                raise google_exceptions.InvalidArgument(f"candidate_count must be at most {self.max_candidates}")
+            call_number = self.calls
+            if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+                self.throttled += 1
+                raise google_exceptions.ResourceExhausted("fake quota exceeded")
+            self.in_flight += 1
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        # Fail every Nth call so runs are reproducible
+        if self.failure_rate and call_number % round(1 / self.failure_rate) == 0:
+            raise RuntimeError("fake upstream failure")
+        return make_response(candidates=candidates)
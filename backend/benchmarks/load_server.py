@@ -0,0 +1,70 @@
+"""Run server.py with fake backends for load testing.
+
+Mongo is either mongomock (``--mongo mock``, needs the optional
+``mongomock-motor`` package) or a real server URL. Gemini is replaced by
+``FakeGenerativeModel`` with a fixed latency, so no key or network is
+needed and results are reproducible. Rate limits are lifted unless
+``--rate-limits`` is given, since every request comes from one client.
+
+    python benchmarks/load_server.py --mongo mock --gemini-latency 0.3 --port 8011
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_mongomock():
+    from mongomock_motor import AsyncMongoMockClient
+
+    import database
+
+    client = AsyncMongoMockClient()
+    database.client = client
+    database.db = client[database.MONGO_DB_NAME]
+    database.projects_collection = database.db.projects
+    database.logos_collection = database.db.logos
+    database.jobs_collection = database.db.jobs
+    database.revisions_collection = database.db.revisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo", default="mock", help='"mock" or a MongoDB URL')
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured rate limits")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    args = parser.parse_args()
+
+    # Configuration is read at import time, so set it before importing the app
+    os.environ["MONGO_URL"] = args.mongo if args.mongo != "mock" else "mongodb://localhost:27017"
+    os.environ.setdefault("MONGO_DB_NAME", "websitebuilder_load")
+    os.environ.setdefault("BLOB_STORE_DIR", os.path.join(BACKEND_DIR, "blobs", "load"))
+    if not args.rate_limits:
+        for name in ("RATE_LIMIT_CLIENT_RATE", "RATE_LIMIT_CLIENT_BURST",
+                     "RATE_LIMIT_GLOBAL_RATE", "RATE_LIMIT_GLOBAL_BURST"):
+            os.environ[name] = "1e9"
+        os.environ.setdefault("GENERATION_MAX_PENDING", "100000")
+    if args.mongo == "mock":
+        # mongomock has no change streams
+        os.environ.setdefault("COLLAB_CHANGE_STREAMS", "0")
+        use_mongomock()
+
+    import uvicorn
+
+    import server
+    from fake_gemini import FakeGenerativeModel
+
+    server.clients.model_factory = lambda name: FakeGenerativeModel(
+        name, latency=args.gemini_latency, failure_rate=args.gemini_failure_rate
+    )
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
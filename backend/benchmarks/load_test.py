@@ -0,0 +1,247 @@
+"""Concurrent mixed-workload load test with per-endpoint RPS and latency.
+
+Boots ``load_server.py`` (mongomock or a real mongod, fake Gemini) unless
+``--base-url`` points at a running backend, seeds projects, then drives a
+weighted mix of CRUD, listing and generation requests from ``--concurrency``
+threads for ``--duration`` seconds. Results can be saved with ``--output``
+and compared with an earlier run with ``--baseline``; the exit status is
+non-zero when an endpoint's p95 or throughput regressed by more than
+``--max-regression``.
+
+    python benchmarks/load_test.py --concurrency 16 --duration 30 --output baseline.json
+    python benchmarks/load_test.py --concurrency 16 --duration 30 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from common import make_project, percentile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "get_project=40,list_projects=20,update_project=15,create_project=10,generate_image=10,generate_logo=5"
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class Workload:
+    """Shared state for the operations: known project ids and the rng."""
+
+    def __init__(self, base_url, seed, prompt_pool):
+        self.base_url = base_url
+        self.random = random.Random(seed)
+        self.prompt_pool = prompt_pool
+        self.project_ids = []
+        self.lock = threading.Lock()
+
+    def pick_project(self):
+        with self.lock:
+            return self.random.choice(self.project_ids)
+
+    def prompt(self):
+        with self.lock:
+            return f"load test prompt {self.random.randrange(self.prompt_pool)}"
+
+
+def get_project(session, workload):
+    return session.get(f"{workload.base_url}/projects/{workload.pick_project()}")
+
+
+def list_projects(session, workload):
+    return session.get(f"{workload.base_url}/projects", params={"limit": 20, "fields": "project_id,name,updated_at"})
+
+
+def update_project(session, workload):
+    project_id = workload.pick_project()
+    return session.put(f"{workload.base_url}/projects/{project_id}", json=make_project(project_id))
+
+
+def create_project(session, workload):
+    project_id = str(uuid.uuid4())
+    response = session.post(f"{workload.base_url}/projects", json=make_project(project_id))
+    if response.ok:
+        with workload.lock:
+            workload.project_ids.append(project_id)
+    return response
+
+
+def generate_image(session, workload):
+    return session.post(f"{workload.base_url}/generate-image", json={"prompt": workload.prompt(), "count": 2})
+
+
+def generate_logo(session, workload):
+    return session.post(
+        f"{workload.base_url}/generate-logo",
+        json={"company_name": workload.prompt(), "style": "modern", "colors": "blue", "industry": "tech"},
+    )
+
+
+OPERATIONS = {
+    "get_project": get_project,
+    "list_projects": list_projects,
+    "update_project": update_project,
+    "create_project": create_project,
+    "generate_image": generate_image,
+    "generate_logo": generate_logo,
+}
+
+
+def drive(workload, weights, concurrency, duration):
+    names = list(weights)
+    cumulative = [sum(list(weights.values())[:i + 1]) for i in range(len(names))]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                point = rng.uniform(0, cumulative[-1])
+                name = next(name for name, bound in zip(names, cumulative) if point <= bound)
+                start = time.perf_counter()
+                try:
+                    ok = OPERATIONS[name](session, workload).ok
+                except requests.RequestException:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                with workload.lock:
+                    latencies[name].append(elapsed)
+                    if not ok:
+                        errors[name] += 1
+
+    threads = [threading.Thread(target=worker, args=(workload.random.random(),)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    results = {}
+    for name, samples in sorted(latencies.items()):
+        results[name] = {
+            "requests": len(samples),
+            "errors": errors[name],
+            "rps": len(samples) / wall,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    return results, wall
+
+
+def report(results, wall, concurrency):
+    total = sum(result["requests"] for result in results.values())
+    print(f"{concurrency} threads, {wall:.1f} s, {total} requests, {total / wall:.1f} req/s")
+    print(f"{'endpoint':<16} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['requests']:>9} {result['errors']:>7} {result['rps']:>8.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+
+def compare(results, baseline, max_regression):
+    """Print regressions against ``baseline`` and return whether any were found."""
+    regressed = False
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            print(f"REGRESSION {name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+            regressed = True
+        if result["rps"] < before["rps"] * (1 - max_regression):
+            print(f"REGRESSION {name}: {before['rps']:.1f} -> {result['rps']:.1f} req/s")
+            regressed = True
+    return regressed
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mongo, gemini_latency):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, "load_server.py"),
+         "--mongo", mongo, "--gemini-latency", str(gemini_latency), "--port", str(port)],
+    )
+    base_url = f"http://127.0.0.1:{port}/api"
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("load_server.py exited during startup")
+        try:
+            if requests.get(f"{base_url}/health/ready", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("load_server.py did not become ready")
+
+
+def run(args):
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_server(args.mongo, args.gemini_latency)
+    try:
+        workload = Workload(base_url, args.seed, args.prompt_pool)
+        with requests.Session() as session:
+            for _ in range(args.projects):
+                create_project(session, workload)
+        if not workload.project_ids:
+            raise SystemExit("Could not seed any projects")
+        results, wall = drive(workload, parse_mix(args.mix), args.concurrency, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report(results, wall, args.concurrency)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if compare(results, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="test a running backend instead of booting load_server.py")
+    parser.add_argument("--mongo", default="mock", help='"mock" or a MongoDB URL for the booted server')
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--projects", type=int, default=200, help="projects created before the run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated operation=weight pairs")
+    parser.add_argument("--prompt-pool", type=int, default=50, help="distinct prompts; fewer means more cache hits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "blobs"))
+BLOB_CHUNK_SIZE = 64 * 1024
+
+
+class BlobStore(ABC):
+    """Content-addressed byte storage. Blobs are named by their SHA-256.
+
+    Methods are blocking; call them through ``asyncio.to_thread`` from
+    request handlers. Object-storage backends implement the same methods.
+    """
+
+    @abstractmethod
+    def put(self, data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def temp_path(self):
+        """Path for writing a blob incrementally before ``put_file``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_file(self, path, digest):
+        """Move the file at ``path``, whose SHA-256 is ``digest``, into the
+        store. Returns False if the blob already existed (``path`` is then
+        removed).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, digest):
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, digest):
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, digest):
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_range(self, digest, start=0, end=None, chunk_size=BLOB_CHUNK_SIZE):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, digest):
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        # Identical content is stored once
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def temp_path(self):
+        # Inside the root so the final rename stays on one filesystem
+        directory = os.path.join(self.root, "tmp")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{uuid.uuid4().hex}.tmp")
+
+    def put_file(self, path, digest):
+        final_path = self._path(digest)
+        if os.path.exists(final_path):
+            os.remove(path)
+            return False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(path, final_path)
+        return True
+
+    def get(self, digest):
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self._path(digest))
+
+    def iter_range(self, digest, start=0, end=None, chunk_size=BLOB_CHUNK_SIZE):
+        """Yield bytes ``start``..``end`` (inclusive) of a blob in chunks."""
+        with open(self._path(digest), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+
+def create_blob_store(backend=BLOB_STORE_BACKEND):
+    if backend == "local":
+        return LocalBlobStore(BLOB_STORE_DIR)
+    raise ValueError(f"Unknown blob store backend: {backend}")
+
+
+blob_store = create_blob_store()
@@ -0,0 +1,94 @@
+import os
+
+import orjson
+from pydantic import ValidationError
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+
+def _validation_message(error):
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in item['loc']) or 'item'}: {item['msg']}" for item in error.errors()
+    )
+
+
+async def bulk_import(collection, items, model, id_field, mode="insert", version_field="version",
+                      batch_size=BULK_BATCH_SIZE):
+    """Validate and write ``items`` in unordered batches.
+
+    ``mode="insert"`` uses ``insert_many`` and reports existing ids as
+    errors; ``mode="upsert"`` replaces documents by ``id_field``, bumping
+    ``version_field`` like a regular update would, and new documents start
+    at version 0 like a create. A document changed between reading its
+    version and replacing it is reported as an error rather than
+    overwritten. One bad item never stops the rest: every failure is
+    reported with its index in ``items``.
+    """
+    written = 0
+    errors = []
+
+    batch = []  # (index in items, document)
+    async def flush():
+        nonlocal written
+        if not batch:
+            return
+        try:
+            if mode == "upsert":
+                ids = [document[id_field] for _, document in batch]
+                existing = {
+                    current[id_field]: current.get(version_field)
+                    async for current in collection.find(
+                        {id_field: {"$in": ids}}, {"_id": 0, id_field: 1, version_field: 1}
+                    )
+                }
+                requests = []
+                for _, document in batch:
+                    # Filter on the version read above (None if new) so a
+                    # concurrent write fails this item instead of being lost
+                    version = existing.get(document[id_field])
+                    document[version_field] = (version or 0) + 1 if document[id_field] in existing else 0
+                    requests.append(ReplaceOne({id_field: document[id_field], version_field: version},
+                                               document, upsert=True))
+                result = await collection.bulk_write(requests, ordered=False)
+                written += result.upserted_count + result.matched_count
+            else:
+                result = await collection.insert_many([document for _, document in batch], ordered=False)
+                written += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            written += details.get("nInserted", 0) + details.get("nUpserted", 0) + details.get("nMatched", 0)
+            for write_error in details.get("writeErrors", []):
+                index, document = batch[write_error["index"]]
+                errors.append({"index": index, id_field: document[id_field], "error": write_error["errmsg"]})
+        batch.clear()
+
+    for index, item in enumerate(items):
+        try:
+            document = model.model_validate(item).dict()
+        except ValidationError as e:
+            errors.append({"index": index, id_field: item.get(id_field) if isinstance(item, dict) else None,
+                           "error": _validation_message(e)})
+            continue
+        batch.append((index, document))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    errors.sort(key=lambda error: error["index"])
+    return {"written": written, "failed": len(errors), "errors": errors}
+
+
+async def export_ndjson(collection, query=None, sort=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield one JSON line per document straight from a cursor.
+
+    Only one cursor batch is held in memory at a time, so exports run in
+    constant memory regardless of collection size.
+    """
+    cursor = collection.find(query or {}, {"_id": 0}, batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    async for document in cursor:
+        yield orjson.dumps(document) + b"\n"
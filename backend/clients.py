@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from generation import GEMINI_MODEL_NAME
+from metrics import gemini_call_duration_seconds, gemini_call_failures_total
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+# "grpc" (library default) or "rest"
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT") or None
+
+
+class ModelClient:
+    """A configured model instance that applies the request timeout and
+    records call latency and failures.
+    """
+
+    def __init__(self, model, timeout=GEMINI_TIMEOUT, name=GEMINI_MODEL_NAME):
+        self.model = model
+        self.timeout = timeout
+        self.name = name
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        kwargs.setdefault("request_options", {"timeout": self.timeout})
+        start = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        except Exception as e:
+            gemini_call_duration_seconds.observe(time.perf_counter() - start, self.name, "error")
+            gemini_call_failures_total.inc(self.name, type(e).__name__)
+            raise
+        gemini_call_duration_seconds.observe(time.perf_counter() - start, self.name, "ok")
+        return response
+
+
+class ClientRegistry:
+    """Long-lived upstream clients, created once per worker process.
+
+    Model instances are built on first use, after ``start`` has configured
+    the SDK, and reused by every request.
+    """
+
+    def __init__(self, model_factory=None, timeout=GEMINI_TIMEOUT):
+        self.model_factory = model_factory
+        self.timeout = timeout
+        self._models = {}
+        self._started = False
+        self._start_error = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Import and configure the Gemini SDK. Blocking, and slower than
+        importing the rest of the app, so it runs from the lifespan hook in
+        a thread or on first use, never at import time.
+        """
+        with self._lock:
+            if self._started:
+                return
+            if self.model_factory is None:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=GEMINI_API_KEY, transport=GEMINI_TRANSPORT)
+                except Exception as e:
+                    self._start_error = e
+                    raise
+                self.model_factory = genai.GenerativeModel
+            self._started = True
+            self._start_error = None
+
+    @property
+    def started(self):
+        return self._started
+
+    def status(self):
+        """"ok", "starting", or the error type of a failed start."""
+        if self._started:
+            return "ok"
+        return type(self._start_error).__name__ if self._start_error else "starting"
+
+    def model(self, name=GEMINI_MODEL_NAME):
+        client = self._models.get(name)
+        if client is None:
+            self.start()
+            client = self._models[name] = ModelClient(self.model_factory(name), self.timeout, name)
+        return client
+
+    def close(self):
+        self._models.clear()
+
+
+clients = ClientRegistry()
@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import os
+import uuid
+
+import orjson
+from pymongo.errors import OperationFailure
+from starlette.websockets import WebSocketDisconnect
+
+from metrics import collab_editors, collab_flushes_total, collab_operations_total
+from project_patch import apply_operations, utc_now_iso, version_filter
+
+logger = logging.getLogger(__name__)
+
+# Edits are written at most this many seconds after the first unsaved one...
+COLLAB_FLUSH_INTERVAL = float(os.getenv("COLLAB_FLUSH_INTERVAL", "2"))
+# ...or as soon as this many operations are waiting
+COLLAB_FLUSH_MAX_OPS = int(os.getenv("COLLAB_FLUSH_MAX_OPS", "200"))
+COLLAB_RETRY_DELAY = float(os.getenv("COLLAB_RETRY_DELAY", "1"))
+# Messages queued for one editor before it is disconnected as too slow
+COLLAB_SEND_QUEUE = int(os.getenv("COLLAB_SEND_QUEUE", "1000"))
+# Version conflicts resolved by rebasing before a flush gives up
+COLLAB_MAX_REBASES = 3
+# Follow saves made by other processes through a change stream (needs a
+# replica set or sharded cluster)
+COLLAB_CHANGE_STREAMS = os.getenv("COLLAB_CHANGE_STREAMS", "1") == "1"
+
+SESSION_FIELDS = {"project_id": 1, "name": 1, "components": 1, "version": 1}
+# Change streams are not available on a standalone mongod
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+CHANGE_PIPELINE = [{"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}}]
+
+
+def _encode(message):
+    return orjson.dumps(message).decode("utf-8")
+
+
+class _Editor:
+    """One connection. Outgoing messages go through a queue drained by a
+    writer task, so every editor sees operations in sequence order and a
+    slow client cannot hold up the others.
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.client_id = uuid.uuid4().hex
+        self.queue = asyncio.Queue(COLLAB_SEND_QUEUE)
+        self.writer = asyncio.create_task(self._write())
+
+    def send(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.writer.cancel()
+            asyncio.create_task(self.websocket.close(code=1013, reason="Too slow"))
+
+    async def _write(self):
+        try:
+            while True:
+                await self.websocket.send_text(await self.queue.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The reader notices the disconnect and removes the editor
+            pass
+
+
+class EditSession:
+    """Live editing state of one project, shared by its connected editors.
+
+    Operations are applied to an in-memory copy as they arrive and written
+    back as one versioned ``$set`` per flush. ``seq`` numbers the accepted
+    operation batches; ``saved_seq`` is the last one known to be in MongoDB.
+    """
+
+    def __init__(self, hub, project):
+        self.hub = hub
+        self.document_id = project.get("_id")
+        self.project_id = project["project_id"]
+        self.name = project.get("name")
+        self.components = project.get("components") or []
+        self.version = project.get("version", 0)
+        self.seq = 0
+        self.saved_seq = 0
+        self.pending = []  # (seq, operations) applied since the last flush
+        self.pending_ops = 0
+        self.deleted = False
+        self.editors = {}
+        self._dirty = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def broadcast(self, message, exclude=None):
+        encoded = _encode(message)
+        for client_id, editor in list(self.editors.items()):
+            if client_id != exclude:
+                editor.send(encoded)
+
+    def apply(self, operations):
+        """Apply a batch of operations and return its sequence number.
+        Raises ``ValueError`` without changing anything if any operation fails.
+        """
+        if self.deleted:
+            raise ValueError("Project was deleted")
+        self.components = apply_operations(self.components, operations)
+        self.seq += 1
+        self.pending.append((self.seq, operations))
+        self.pending_ops += len(operations)
+        collab_operations_total.inc(amount=len(operations))
+        self._dirty.set()
+        if self.pending_ops >= self.hub.flush_max_ops:
+            self._full.set()
+        return self.seq
+
+    async def flush(self):
+        """Write all applied operations and return whether there were any.
+        Returns once they are in MongoDB, or raises, in which case they stay
+        pending for the next attempt.
+        """
+        async with self._lock:
+            rebases = 0
+            while self.pending and not self.deleted:
+                count, seq, components = len(self.pending), self.seq, self.components
+                self._dirty.clear()
+                self._full.clear()
+                try:
+                    result = await self.hub.collection.update_one(
+                        {"project_id": self.project_id, **version_filter(self.version)},
+                        {"$set": {"components": components, "updated_at": utc_now_iso(), "version": self.version + 1}},
+                    )
+                except Exception:
+                    collab_flushes_total.inc("error")
+                    self._dirty.set()
+                    raise
+                if result.matched_count == 0:
+                    # Someone saved through the REST API since we loaded
+                    collab_flushes_total.inc("conflict")
+                    rebases += 1
+                    if rebases > COLLAB_MAX_REBASES:
+                        self._dirty.set()
+                        raise RuntimeError(f"Project {self.project_id} keeps changing underneath the session")
+                    await self._rebase()
+                    continue
+                collab_flushes_total.inc("saved")
+                del self.pending[:count]
+                self.pending_ops = sum(len(operations) for _, operations in self.pending)
+                if self.pending:
+                    self._dirty.set()
+                self.version, self.saved_seq = self.version + 1, seq
+                self.broadcast({"type": "saved", "version": self.version, "seq": seq})
+                if self.hub.on_flush is not None:
+                    await self.hub.on_flush(self.project_id, self.version, self.name, components)
+                return True
+            return False
+
+    async def sync(self, version=None):
+        """Catch up with a save made elsewhere: another process, or the REST
+        API. Editors get a ``reset``; ``version`` (None if unknown) skips
+        saves the session already has, including its own.
+        """
+        async with self._lock:
+            if self.deleted or (version is not None and version <= self.version):
+                return
+            await self._rebase()
+
+    async def _rebase(self):
+        """Reload the stored project and replay the pending batches on top
+        of it, dropping those that no longer apply.
+        """
+        stored = await self.hub.collection.find_one({"project_id": self.project_id}, SESSION_FIELDS)
+        if stored is None:
+            self.deleted = True
+            self.pending, self.pending_ops = [], 0
+            self.broadcast({"type": "deleted"})
+            for editor in list(self.editors.values()):
+                asyncio.create_task(editor.websocket.close(code=4404, reason="Project not found"))
+            return
+        components, kept, dropped = stored.get("components") or [], [], []
+        for seq, operations in self.pending:
+            try:
+                components = apply_operations(components, operations)
+                kept.append((seq, operations))
+            except ValueError:
+                dropped.append(seq)
+        self.components, self.version, self.name = components, stored.get("version", 0), stored.get("name")
+        self.pending = kept
+        self.pending_ops = sum(len(operations) for _, operations in kept)
+        # Editors replace their copy; dropped batches are no longer in it
+        self.broadcast({
+            "type": "reset", "version": self.version, "seq": self.seq, "name": self.name,
+            "components": self.components, "dropped": dropped,
+        })
+
+    async def _flush_loop(self):
+        while True:
+            await self._dirty.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.hub.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Could not save live edits to project %s", self.project_id)
+                await asyncio.sleep(COLLAB_RETRY_DELAY)
+            if not self.editors and not self.pending:
+                self.hub._discard(self, cancel=False)
+                return
+
+    def stop(self):
+        self._flusher.cancel()
+
+
+class CollabHub:
+    """Live editing sessions of the projects open in this process.
+
+    Operations are broadcast to the editors connected to the same process
+    as they arrive. Editors connected to other workers see them when they
+    are flushed: a change stream on the collection tells each process's
+    sessions about saves they did not make, and they rebase onto them.
+    Without change streams (standalone mongod) editors of one project
+    must reach the same process, which serve.py ensures by running one
+    worker. Every flush is guarded by the stored version either way.
+    """
+
+    def __init__(self, collection, operation_model, on_flush=None,
+                 flush_interval=COLLAB_FLUSH_INTERVAL, flush_max_ops=COLLAB_FLUSH_MAX_OPS):
+        self.collection = collection
+        self.operation_model = operation_model
+        self.on_flush = on_flush  # async (project_id, version, name, components)
+        self.flush_interval = flush_interval
+        self.flush_max_ops = flush_max_ops
+        self.sessions = {}
+        self._documents = {}  # _id -> session, to match change events
+        self._opening = {}
+        self._watcher = None
+
+    def start(self):
+        if COLLAB_CHANGE_STREAMS:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        resume_after = None
+        while True:
+            try:
+                async with self.collection.watch(CHANGE_PIPELINE, resume_after=resume_after) as stream:
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        self._on_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("No change streams, live edits are only shared within this process: %s", e)
+                    return
+                logger.exception("Change stream failed, reopening")
+                resume_after = None
+            except Exception:
+                logger.exception("Change stream failed, reopening")
+            await asyncio.sleep(COLLAB_RETRY_DELAY)
+
+    def _on_change(self, change):
+        session = self._documents.get(change["documentKey"]["_id"])
+        if session is None:
+            return
+        if change["operationType"] == "update":
+            version = change["updateDescription"]["updatedFields"].get("version")
+            if version is None:
+                return
+        elif change["operationType"] == "replace":
+            version = change["fullDocument"].get("version", 0)
+        else:
+            version = None
+        asyncio.create_task(self._sync(session, version))
+
+    async def _sync(self, session, version):
+        try:
+            await session.sync(version)
+        except Exception:
+            logger.exception("Could not follow a save to project %s", session.project_id)
+
+    async def _open(self, project_id):
+        project = await self.collection.find_one({"project_id": project_id}, SESSION_FIELDS)
+        if project is None:
+            return None
+        session = self.sessions[project_id] = EditSession(self, project)
+        self._documents[session.document_id] = session
+        return session
+
+    async def join(self, project_id):
+        """Return the project's session, loading it if needed, or ``None``
+        if the project does not exist.
+        """
+        while True:
+            session = self.sessions.get(project_id)
+            if session is not None:
+                return session
+            task = self._opening.get(project_id)
+            if task is None:
+                task = self._opening[project_id] = asyncio.ensure_future(self._open(project_id))
+                task.add_done_callback(lambda _: self._opening.pop(project_id, None))
+            session = await asyncio.shield(task)
+            # Another editor may have opened and left it in the meantime
+            if session is None or self.sessions.get(project_id) is session:
+                return session
+
+    def _discard(self, session, cancel=True):
+        if self.sessions.get(session.project_id) is session:
+            del self.sessions[session.project_id]
+        if self._documents.get(session.document_id) is session:
+            del self._documents[session.document_id]
+        if cancel:
+            session.stop()
+
+    async def leave(self, session, editor):
+        session.editors.pop(editor.client_id, None)
+        editor.writer.cancel()
+        # An editor's operations are saved before its connection is gone
+        try:
+            await session.flush()
+        except Exception:
+            logger.exception("Could not save live edits to project %s; retrying", session.project_id)
+            return
+        if not session.editors and not session.pending:
+            self._discard(session)
+
+    async def _handle(self, session, editor, text):
+        client_seq = None
+        try:
+            message = orjson.loads(text)
+            if not isinstance(message, dict):
+                raise ValueError("Messages must be JSON objects")
+            client_seq = message.get("client_seq")
+            if message.get("type") == "ops":
+                operations = [self.operation_model.model_validate(op) for op in message.get("operations") or []]
+                if not operations:
+                    raise ValueError("operations is required")
+                seq = session.apply(operations)
+                editor.send(_encode({"type": "ack", "client_seq": client_seq, "seq": seq}))
+                session.broadcast({
+                    "type": "ops", "seq": seq, "client_id": editor.client_id,
+                    "operations": [operation.model_dump(exclude_none=True) for operation in operations],
+                }, exclude=editor.client_id)
+            elif message.get("type") == "save":
+                # A flush tells every editor, this one included
+                if not await session.flush():
+                    editor.send(_encode({"type": "saved", "version": session.version, "seq": session.saved_seq}))
+            else:
+                raise ValueError(f"Unknown message type {message.get('type')!r}")
+        except ValueError as e:
+            # Includes JSON and validation errors; nothing was applied
+            editor.send(_encode({"type": "error", "client_seq": client_seq, "detail": str(e)}))
+        except Exception as e:
+            logger.exception("Live edit failed for project %s", session.project_id)
+            editor.send(_encode({"type": "error", "client_seq": client_seq, "detail": str(e)}))
+
+    async def serve(self, websocket, project_id):
+        """Accept ``websocket`` and run the editing protocol until it disconnects."""
+        await websocket.accept()
+        try:
+            session = await self.join(project_id)
+        except Exception:
+            logger.exception("Could not open live editing session for project %s", project_id)
+            await websocket.close(code=1011)
+            return
+        if session is None:
+            await websocket.close(code=4404, reason="Project not found")
+            return
+        editor = _Editor(websocket)
+        session.editors[editor.client_id] = editor
+        collab_editors.inc()
+        try:
+            editor.send(_encode({
+                "type": "hello", "client_id": editor.client_id, "version": session.version,
+                "seq": session.seq, "saved_seq": session.saved_seq,
+                "name": session.name, "components": session.components,
+            }))
+            while True:
+                await self._handle(session, editor, await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            collab_editors.dec()
+            await self.leave(session, editor)
+
+    async def close(self):
+        """Save every session's pending edits; called at shutdown."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+        for session in list(self.sessions.values()):
+            try:
+                await session.flush()
+            except Exception:
+                logger.exception("Live edits to project %s were not saved", session.project_id)
+            self._discard(session)
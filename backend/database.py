@@ -0,0 +1,48 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from metrics import MongoCommandListener
+
+load_dotenv()
+
+# MongoDB connection
+MONGO_URL = os.getenv("MONGO_URL")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "websitebuilder")
+
+# Connection pool tuning
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+
+# Motor runs every operation without blocking the event loop, so one slow
+# query no longer stalls the other requests served by the same worker.
+# connect=False defers connections and monitor threads to the first
+# operation, which happens inside each worker's event loop; importing
+# this module opens nothing.
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    connect=False,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[MongoCommandListener()],
+)
+db = client[MONGO_DB_NAME]
+projects_collection = db.projects
+logos_collection = db.logos
+jobs_collection = db.jobs
+revisions_collection = db.revisions
+
+
+async def ping(timeout):
+    """Round-trip to the server, raising if it does not answer in ``timeout`` seconds."""
+    await asyncio.wait_for(client.admin.command("ping"), timeout)
+
+
+def close():
+    client.close()
@@ -0,0 +1,108 @@
+"""Verify that every API query is served by an index.
+
+Runs ``explain()`` on the query each endpoint issues and exits non-zero
+if any winning plan contains a COLLSCAN stage.
+
+    python diagnostics.py [--ensure-indexes]
+"""
+import argparse
+import asyncio
+import sys
+
+from database import db, jobs_collection, logos_collection, projects_collection, revisions_collection
+from listing import LOGO_SORT_FIELDS, PROJECT_SORT_FIELDS, build_page_query, encode_cursor, name_filter
+from migrations import ensure_indexes
+from search import build_search_pipeline
+
+
+def plan_stages(plan):
+    """Yield every stage name in an explain plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for key in ("inputStage", "queryPlan", "winningPlan"):
+            if key in plan:
+                yield from plan_stages(plan[key])
+        for child in plan.get("inputStages", []):
+            yield from plan_stages(child)
+    elif isinstance(plan, list):
+        for child in plan:
+            yield from plan_stages(child)
+
+
+def winning_plan(explain):
+    if "stages" in explain:
+        # Aggregations explain their initial query under the $cursor stage
+        explain = explain["stages"][0]["$cursor"]
+    query_planner = explain.get("queryPlanner", explain)
+    return query_planner["winningPlan"]
+
+
+def endpoint_queries():
+    """(endpoint, collection, kind, query, sort) for every query the API runs.
+    For aggregations the pipeline takes the place of the query.
+    """
+    sample_cursor = encode_cursor({"updated_at": "2024-01-01T00:00:00", "project_id": "x"}, "updated_at", "project_id")
+    queries = [
+        ("GET /api/projects/{id}", projects_collection, "find", {"project_id": "x"}, None),
+        ("PUT /api/projects/{id}", projects_collection, "update", {"project_id": "x"}, None),
+        ("DELETE /api/projects/{id}", projects_collection, "delete", {"project_id": "x"}, None),
+        ("GET /api/logos/{id}/image", logos_collection, "find", {"logo_id": "x"}, None),
+        ("GET /api/jobs/{id}", jobs_collection, "find", {"job_id": "x"}, None),
+        ("job recovery", jobs_collection, "find", {"status": "queued"}, None),
+        ("GET /api/projects/{id}/revisions", revisions_collection, "find", {"project_id": "x"}, {"version": -1}),
+        ("revision reconstruction", revisions_collection, "find",
+         {"project_id": "x", "version": {"$lte": 40, "$gt": 20}}, {"version": -1}),
+    ]
+    for field in PROJECT_SORT_FIELDS:
+        query, sort = build_page_query([], field, "project_id")
+        queries.append((f"GET /api/projects?sort={field}", projects_collection, "find", query, sort))
+    query, sort = build_page_query([name_filter("site")], "updated_at", "project_id", cursor=sample_cursor)
+    queries.append(("GET /api/projects?name=..&cursor=..", projects_collection, "find", query, sort))
+    for field in LOGO_SORT_FIELDS:
+        query, sort = build_page_query([], field, "logo_id")
+        queries.append((f"GET /api/logos?sort={field}", logos_collection, "find", query, sort))
+    sample_cursor = encode_cursor({"score": 1.5, "project_id": "x"}, "score", "project_id")
+    pipeline = build_search_pipeline("landing page", [], {"_id": 0}, "project_id", 50, sample_cursor)
+    queries.append(("GET /api/projects/search", projects_collection, "aggregate", pipeline, None))
+    pipeline = build_search_pipeline("coffee", [], {"_id": 0}, "logo_id", 50)
+    queries.append(("GET /api/logos/search", logos_collection, "aggregate", pipeline, None))
+    return queries
+
+
+async def explain(collection, kind, query, sort):
+    if kind == "find":
+        cursor = collection.find(query, {"_id": 0})
+        if sort:
+            cursor = cursor.sort(sort).limit(51)
+        return await cursor.explain()
+    if kind == "aggregate":
+        command = {"aggregate": collection.name, "pipeline": query, "cursor": {}}
+    elif kind == "update":
+        command = {"update": collection.name, "updates": [{"q": query, "u": {"$set": {}}}]}
+    else:
+        command = {"delete": collection.name, "deletes": [{"q": query, "limit": 1}]}
+    return await db.command({"explain": command, "verbosity": "queryPlanner"})
+
+
+async def run(create_missing):
+    if create_missing:
+        await ensure_indexes()
+    failures = 0
+    for endpoint, collection, kind, query, sort in endpoint_queries():
+        stages = list(plan_stages(winning_plan(await explain(collection, kind, query, sort))))
+        status = "FAIL" if "COLLSCAN" in stages else "ok"
+        if status == "FAIL":
+            failures += 1
+        print(f"{status:4} {endpoint:40} {' <- '.join(stages)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ensure-indexes", action="store_true", help="create missing indexes first")
+    args = parser.parse_args()
+    failures = asyncio.run(run(args.ensure_indexes))
+    if failures:
+        print(f"\n{failures} endpoint quer{'y uses' if failures == 1 else 'ies use'} a collection scan")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,270 @@
+import asyncio
+import base64
+import functools
+import logging
+import os
+import random
+import time
+import weakref
+
+from ratelimit import RateLimited
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+
+# Concurrency limits for Gemini calls
+GENERATION_PER_REQUEST_CONCURRENCY = int(os.getenv("GENERATION_PER_REQUEST_CONCURRENCY", "4"))
+GENERATION_GLOBAL_CONCURRENCY = int(os.getenv("GENERATION_GLOBAL_CONCURRENCY", "16"))
+
+# Calls waiting for or holding a global slot before new requests are shed
+GENERATION_MAX_PENDING = int(os.getenv("GENERATION_MAX_PENDING", "64"))
+
+# Retries when Gemini throttles us (429 / resource exhausted / unavailable)
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "0.5"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "8"))
+
+# Variants requested per call through candidate_count; a model that
+# rejects it falls back to one call per variant
+GEMINI_MAX_CANDIDATES = int(os.getenv("GEMINI_MAX_CANDIDATES", "4"))
+
+# Most variants one request may ask for
+GENERATION_MAX_VARIANTS = int(os.getenv("GENERATION_MAX_VARIANTS", "8"))
+
+IMAGE_GENERATION_CONFIG = {"response_mime_type": "image/png"}
+
+
+@functools.cache
+def google_exceptions():
+    # google.api_core comes in with the Gemini SDK; importing it here at
+    # module load would put it on the API process's startup path
+    from google.api_core import exceptions
+    return exceptions
+
+
+@functools.cache
+def throttling_errors():
+    exceptions = google_exceptions()
+    return (exceptions.ResourceExhausted, exceptions.TooManyRequests, exceptions.ServiceUnavailable)
+
+
+# Shared by every request on this worker so a burst of multi-variant
+# requests cannot open an unbounded number of upstream calls.
+_global_limiter = asyncio.Semaphore(GENERATION_GLOBAL_CONCURRENCY)
+_pending_calls = 0
+# Moving average of call latency, used to estimate Retry-After
+_average_latency = 5.0
+
+
+class UpstreamThrottled(RateLimited):
+    """Gemini kept throttling after every retry."""
+
+
+def pending_calls():
+    return _pending_calls
+
+
+def admit(cost):
+    """Raise ``RateLimited`` if ``cost`` more calls would overfill the backlog.
+
+    This is a soft limit checked before a request starts; calls admitted
+    at the same moment may overshoot it slightly.
+    """
+    if _pending_calls + cost > GENERATION_MAX_PENDING:
+        retry_after = (_pending_calls / GENERATION_GLOBAL_CONCURRENCY) * _average_latency
+        raise RateLimited("Generation queue is full", retry_after)
+
+
+def _retry_delay(attempt):
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+def extract_images(response):
+    """Return the inline images of every candidate in a Gemini response as
+    PNG data URLs.
+    """
+    images = []
+    for candidate in response.candidates:
+        for part in candidate.content.parts:
+            if hasattr(part, 'inline_data') and part.inline_data:
+                image_bytes = part.inline_data.data
+                base64_image = base64.b64encode(image_bytes).decode('utf-8')
+                images.append(f"data:image/png;base64,{base64_image}")
+    return images
+
+
+async def _generate_one(model, prompt, generation_config, request_limiter):
+    global _pending_calls, _average_latency
+    _pending_calls += 1
+    try:
+        for attempt in range(1, GEMINI_MAX_RETRIES + 2):
+            try:
+                async with request_limiter, _global_limiter:
+                    start = time.monotonic()
+                    # generate_content is blocking, keep it off the event loop
+                    response = await asyncio.to_thread(
+                        model.generate_content,
+                        prompt,
+                        generation_config=generation_config,
+                    )
+                    _average_latency = 0.8 * _average_latency + 0.2 * (time.monotonic() - start)
+                return extract_images(response)
+            except throttling_errors() as e:
+                if attempt > GEMINI_MAX_RETRIES:
+                    raise UpstreamThrottled(f"Gemini is throttling requests: {e}", GEMINI_RETRY_MAX_DELAY) from e
+                # Back off without holding a slot so other calls can proceed
+                await asyncio.sleep(_retry_delay(attempt))
+    finally:
+        _pending_calls -= 1
+
+
+class GenerationBackend:
+    """Turns "``count`` variants of a prompt" into as few upstream calls as
+    the model allows.
+
+    Variants are requested ``max_candidates`` at a time through
+    ``candidate_count``. The first time a model rejects that as an invalid
+    argument, the backend drops to one candidate per call for good and the
+    batch is retried as parallel single calls.
+    """
+
+    def __init__(self, model, max_candidates=GEMINI_MAX_CANDIDATES):
+        self.model = model
+        self.max_candidates = max(1, max_candidates)
+
+    def plan(self, count):
+        """Candidates per upstream call for ``count`` variants."""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        full, rest = divmod(count, self.max_candidates)
+        return [self.max_candidates] * full + ([rest] if rest else [])
+
+    async def call(self, prompt, candidates, generation_config, request_limiter):
+        """Return ``(images, errors)`` for one planned call; ``errors`` holds
+        the messages of fallback single calls that failed. Raises if no
+        image was generated.
+        """
+        if candidates == 1:
+            return await _generate_one(self.model, prompt, generation_config, request_limiter), []
+        config = {**generation_config, "candidate_count": candidates}
+        try:
+            return await _generate_one(self.model, prompt, config, request_limiter), []
+        except google_exceptions().InvalidArgument as e:
+            rejected = e
+        results = await asyncio.gather(
+            *(_generate_one(self.model, prompt, generation_config, request_limiter) for _ in range(candidates)),
+            return_exceptions=True,
+        )
+        images = [image for result in results if not isinstance(result, Exception) for image in result]
+        failures = [result for result in results if isinstance(result, Exception)]
+        if not images:
+            # Single calls fail too, so the request itself was the problem
+            raise failures[0]
+        if self.max_candidates > 1:
+            logger.warning("Model rejected candidate_count=%d, using single calls: %s", candidates, rejected)
+            self.max_candidates = 1
+        return images, [str(failure) for failure in failures]
+
+
+_backends = weakref.WeakKeyDictionary()
+
+
+def backend_for(model):
+    """The backend of a long-lived model client, remembering what it supports."""
+    backend = _backends.get(model)
+    if backend is None:
+        backend = _backends[model] = GenerationBackend(model)
+    return backend
+
+
+def upstream_calls(model, count):
+    """Number of upstream calls ``count`` variants currently cost."""
+    return len(backend_for(model).plan(count))
+
+
+async def generate_variants(model, prompt, count, generation_config=IMAGE_GENERATION_CONFIG):
+    """Generate ``count`` variants of ``prompt`` in as few concurrent calls
+    as the model allows.
+
+    Returns ``(images, errors)``; a failed call contributes its error
+    message instead of cancelling the calls that succeeded. Raises
+    ``UpstreamThrottled`` if nothing succeeded because of throttling.
+    """
+    backend = backend_for(model)
+    request_limiter = asyncio.Semaphore(GENERATION_PER_REQUEST_CONCURRENCY)
+    results = await asyncio.gather(
+        *(backend.call(prompt, candidates, generation_config, request_limiter) for candidates in backend.plan(count)),
+        return_exceptions=True,
+    )
+
+    images = []
+    errors = []
+    throttled = None
+    for result in results:
+        if isinstance(result, Exception):
+            errors.append(str(result))
+            if isinstance(result, UpstreamThrottled):
+                throttled = result
+        else:
+            images.extend(result[0])
+            errors.extend(result[1])
+    if throttled is not None and not images:
+        raise throttled
+    return images, errors
+
+
+async def iter_variants(model, prompt, count, generation_config=IMAGE_GENERATION_CONFIG):
+    """Yield ``(images, error)`` for each upstream call as soon as it returns.
+
+    Pending calls are cancelled if the consumer stops early, e.g. when a
+    streaming client disconnects.
+    """
+    backend = backend_for(model)
+    request_limiter = asyncio.Semaphore(GENERATION_PER_REQUEST_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(backend.call(prompt, candidates, generation_config, request_limiter))
+        for candidates in backend.plan(count)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                images, errors = await next_done
+            except Exception as e:
+                yield [], str(e)
+                continue
+            for error in errors:
+                yield [], error
+            yield images, None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+_in_flight = {}
+
+
+def in_flight(key):
+    """Whether a generation for ``key`` is running and can be joined."""
+    return key in _in_flight
+
+
+async def coalesce(key, factory):
+    """Run ``factory()`` once for concurrent callers with the same ``key``.
+
+    Identical generation requests that arrive while one is running share
+    its upstream calls instead of repeating them. A caller that goes away
+    does not cancel the shared work.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = _in_flight[key] = asyncio.ensure_future(factory())
+        task.add_done_callback(lambda done: _finished(key, done))
+    return await asyncio.shield(task)
+
+
+def _finished(key, task):
+    _in_flight.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # retrieved even when every caller went away
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# In-process tier
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "256"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", "86400"))
+
+# Optional persistent tier, disabled unless a directory is configured
+GENERATION_CACHE_DIR = os.getenv("GENERATION_CACHE_DIR", "")
+GENERATION_CACHE_DISK_MAX_BYTES = int(os.getenv("GENERATION_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.split()).casefold()
+
+
+def cache_key(prompt, model_name, generation_config, count):
+    """Content address of a generation request."""
+    payload = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "model": model_name,
+            "config": generation_config or {},
+            "count": count,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_size(images):
+    return sum(len(image) for image in images)
+
+
+class MemoryTier:
+    """LRU bounded by entry count and total bytes, with a TTL."""
+
+    def __init__(self, max_entries, max_bytes, ttl, sizeof=_entry_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def pop(self, key):
+        if key in self._entries:
+            self._remove(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+
+class DiskTier:
+    """One JSON file per key, expired by TTL and evicted oldest-first by size.
+
+    The byte total is tracked per process; with several workers sharing a
+    directory the budget is enforced approximately.
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._bytes = None
+        # Calls arrive from several threads through asyncio.to_thread
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                with self._lock:
+                    removed = self._unlink(path)
+                    if self._bytes is not None:
+                        self._bytes -= removed
+                return None
+            with open(path, "r") as f:
+                return json.load(f)["images"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, images):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"images": images}, f)
+        with self._lock:
+            # Overwriting a key replaces its old file rather than adding to it
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._bytes += os.path.getsize(path) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self):
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        now = time.time()
+        for mtime, size, path in files:
+            if total <= self.max_bytes and mtime + self.ttl >= now:
+                continue
+            self._unlink(path)
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def _unlink(self, path):
+        """Remove ``path`` and return its size, or 0 if it was already gone."""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+
+class GenerationCache:
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    async def get(self, key):
+        images = self.memory.get(key)
+        if images is not None:
+            self.memory_hits += 1
+            return images
+        if self.disk is not None:
+            images = await asyncio.to_thread(self.disk.get, key)
+            if images is not None:
+                self.disk_hits += 1
+                self.memory.set(key, images)
+                return images
+        self.misses += 1
+        return None
+
+    async def set(self, key, images):
+        self.stores += 1
+        self.memory.set(key, images)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, images)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.bytes,
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None,
+            "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+        }
+
+
+generation_cache = GenerationCache(
+    MemoryTier(GENERATION_CACHE_SIZE, GENERATION_CACHE_MAX_BYTES, GENERATION_CACHE_TTL),
+    DiskTier(GENERATION_CACHE_DIR, GENERATION_CACHE_DISK_MAX_BYTES, GENERATION_CACHE_TTL)
+    if GENERATION_CACHE_DIR else None,
+)
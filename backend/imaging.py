@@ -0,0 +1,121 @@
+import asyncio
+import base64
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+LOGO_THUMBNAIL_SIZES = tuple(
+    int(size) for size in os.getenv("LOGO_THUMBNAIL_SIZES", "64,128,256").split(",") if size.strip()
+)
+
+# Encoding is CPU-bound, so it runs in worker processes rather than threads
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+
+OUTPUT_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+_process_pool = None
+
+
+def decode_data_url(data_url):
+    """Split a ``data:<type>;base64,<payload>`` URL into ``(bytes, content_type)``."""
+    if data_url.startswith("data:"):
+        header, _, payload = data_url.partition(",")
+        content_type = header[len("data:"):].split(";")[0] or "application/octet-stream"
+    else:
+        payload, content_type = data_url, "image/png"
+    try:
+        return base64.b64decode(payload, validate=True), content_type
+    except ValueError:
+        raise ValueError("image_data is not valid base64")
+
+
+def encode_data_url(image_bytes, content_type="image/png"):
+    return f"data:{content_type};base64,{base64.b64encode(image_bytes).decode('utf-8')}"
+
+
+def _open_image(image_bytes):
+    # PIL is imported on first use, in the worker process that needs it,
+    # so it stays off the API process's startup path
+    from PIL import Image, UnidentifiedImageError
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except UnidentifiedImageError:
+        raise ValueError("image_data is not a supported image")
+    image.load()
+    return image
+
+
+def process_image(image_bytes, format="png", width=None, height=None, quality=85):
+    """Resize and re-encode an image, dropping EXIF/ICC/text metadata.
+
+    With both ``width`` and ``height`` the image is scaled to fit inside
+    that box; with one of them the other follows the aspect ratio.
+    Returns ``(bytes, content_type)``.
+    """
+    from PIL import Image
+
+    pil_format, content_type = OUTPUT_FORMATS[format]
+    with _open_image(image_bytes) as image:
+        if width or height:
+            target_width = width or round(image.width * height / image.height)
+            target_height = height or round(image.height * width / image.width)
+            scale = min(target_width / image.width, target_height / image.height)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+        image.info = {}
+        buffer = io.BytesIO()
+        if pil_format == "WEBP":
+            image.save(buffer, format=pil_format, quality=quality, method=4)
+        else:
+            image.save(buffer, format=pil_format, optimize=True)
+    return buffer.getvalue(), content_type
+
+
+def make_thumbnails(image_bytes, sizes=LOGO_THUMBNAIL_SIZES):
+    """Render PNG thumbnails that fit within ``size`` x ``size`` for each size."""
+    from PIL import Image
+
+    thumbnails = {}
+    with _open_image(image_bytes) as image:
+        for size in sizes:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format="PNG", optimize=True)
+            thumbnails[size] = buffer.getvalue()
+    return thumbnails
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn: workers must not inherit the Mongo client or event loop threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_in_process_pool(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(fn, *args, **kwargs))
+
+
+async def process_data_url(data_url, **options):
+    """Post-process a ``data:`` URL image in the process pool."""
+    image_bytes, _ = decode_data_url(data_url)
+    processed, content_type = await run_in_process_pool(process_image, image_bytes, **options)
+    return encode_data_url(processed, content_type)
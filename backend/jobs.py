@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from pymongo import ReturnDocument
+
+from ratelimit import RateLimited
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "60"))
+# A running job whose lease has expired is assumed to belong to a dead worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+# Queued jobs, across every process, before new submissions are rejected
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "1000"))
+# Larger results go to the blob store; Mongo documents are capped at 16 MB
+JOB_INLINE_RESULT_MAX_BYTES = int(os.getenv("JOB_INLINE_RESULT_MAX_BYTES", str(1024 * 1024)))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class JobQueueFull(RateLimited):
+    """Too many jobs are waiting; ``retry_after`` estimates when one finishes."""
+
+
+def retry_delay(attempt):
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+class JobQueue:
+    """Priority queue of generation jobs.
+
+    Jobs are recorded in Mongo before they are queued, so they survive a
+    restart, and are claimed atomically so several API processes can share
+    the collection. The in-process queue only orders work for the local
+    workers; the bounded worker pool is what smooths out bursts. Results
+    over ``inline_result_max_bytes`` are kept in ``blob_store`` and only
+    referenced from the job document.
+    """
+
+    def __init__(self, collection, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS, max_queued=JOB_MAX_QUEUED,
+                 blob_store=None, inline_result_max_bytes=JOB_INLINE_RESULT_MAX_BYTES):
+        self.collection = collection
+        self.blob_store = blob_store
+        self.inline_result_max_bytes = inline_result_max_bytes
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        # Moving average of job run time, used to estimate Retry-After
+        self._average_duration = 10.0
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._sequence = 0
+
+    def register(self, kind, handler):
+        """Register ``async handler(params) -> result`` for a job kind."""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # Recovery needs Mongo; running it in the background lets the
+        # process come up (and report not ready) while Mongo is unreachable
+        self._tasks.append(asyncio.create_task(self._recover_until_done()))
+
+    @property
+    def running(self):
+        return any(not task.done() for task in self._tasks)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind, params, priority=0, charge=None):
+        """Record and queue a job and return its id.
+
+        Raises ``JobQueueFull`` when ``max_queued`` jobs are waiting;
+        ``charge()`` runs, and may raise, only once there is room.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        queued = await self.collection.count_documents({"status": QUEUED}, limit=self.max_queued)
+        if queued >= self.max_queued:
+            raise JobQueueFull("Job queue is full", self._average_duration / max(1, self.workers))
+        if charge is not None:
+            charge()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "params": params,
+            "priority": priority,
+            "status": QUEUED,
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "finished_at": None,
+        }
+        await self.collection.insert_one(job)
+        self._enqueue(job["job_id"], priority)
+        return job["job_id"]
+
+    async def get(self, job_id):
+        job = await self.collection.find_one({"job_id": job_id}, {"_id": 0, "params": 0})
+        if job and job.get("result_sha256"):
+            job["result"] = orjson.loads(await asyncio.to_thread(self.blob_store.get, job.pop("result_sha256")))
+        return job
+
+    def _enqueue(self, job_id, priority):
+        # Higher priority first, FIFO within a priority
+        self._sequence += 1
+        self._queue.put_nowait((-priority, self._sequence, job_id))
+
+    async def _recover_until_done(self):
+        while True:
+            try:
+                await self._recover()
+                return
+            except Exception:
+                logger.exception("Job recovery failed, retrying")
+                await asyncio.sleep(retry_delay(1) + 1)
+
+    async def _recover(self):
+        stale = _now() - timedelta(seconds=JOB_LEASE_SECONDS)
+        await self.collection.update_many(
+            {"status": RUNNING, "updated_at": {"$lt": stale}},
+            {"$set": {"status": QUEUED, "updated_at": _now()}},
+        )
+        cursor = self.collection.find({"status": QUEUED}, {"_id": 0, "job_id": 1, "priority": 1})
+        async for job in cursor:
+            self._enqueue(job["job_id"], job.get("priority", 0))
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job %s crashed the worker loop", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        job = await self.collection.find_one_and_update(
+            {"job_id": job_id, "status": QUEUED},
+            {"$set": {"status": RUNNING, "updated_at": _now()}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            # Already claimed by another process, or finished
+            return
+
+        start = asyncio.get_running_loop().time()
+        try:
+            result = await self._handlers[job["kind"]](job["params"])
+        except Exception as e:
+            await self._failed(job, e)
+            return
+
+        self._average_duration = 0.8 * self._average_duration + 0.2 * (asyncio.get_running_loop().time() - start)
+        try:
+            await self.collection.update_one(
+                {"job_id": job_id},
+                {"$set": {**await self._result_fields(result), "status": SUCCEEDED, "error": None,
+                          "updated_at": _now(), "finished_at": _now()}},
+            )
+        except Exception as e:
+            # Otherwise the job would stay running until its lease expires
+            logger.exception("Could not store the result of job %s", job_id)
+            await self._failed(job, e)
+
+    async def _result_fields(self, result):
+        if self.blob_store is not None:
+            encoded = orjson.dumps(result)
+            if len(encoded) > self.inline_result_max_bytes:
+                return {"result": None, "result_sha256": await asyncio.to_thread(self.blob_store.put, encoded)}
+        return {"result": result, "result_sha256": None}
+
+    async def _failed(self, job, error):
+        """Requeue ``job`` with backoff, or mark it failed after the last attempt."""
+        job_id = job["job_id"]
+        if job["attempts"] < self.max_attempts:
+            delay = retry_delay(job["attempts"])
+            await self.collection.update_one(
+                {"job_id": job_id},
+                {"$set": {"status": QUEUED, "error": str(error), "updated_at": _now(),
+                          "retry_at": _now() + timedelta(seconds=delay)}},
+            )
+            asyncio.get_running_loop().call_later(delay, self._enqueue, job_id, job["priority"])
+        else:
+            await self.collection.update_one(
+                {"job_id": job_id},
+                {"$set": {"status": FAILED, "error": str(error), "updated_at": _now(), "finished_at": _now()}},
+            )
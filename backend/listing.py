@@ -0,0 +1,103 @@
+import base64
+import json
+import re
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Fields each listing may project and sort on. Sorting always breaks ties
+# on the id field so the (sort value, id) pair is a unique keyset cursor.
+# Every sort field holds a string (timestamps are ISO 8601 strings).
+PROJECT_FIELDS = ("project_id", "name", "components", "created_at", "updated_at", "version")
+PROJECT_SORT_FIELDS = ("updated_at", "created_at", "name")
+LOGO_FIELDS = (
+    "logo_id", "name", "prompt", "created_at", "image_sha256", "image_size",
+    "image_content_type", "thumbnails", "image_data",
+)
+LOGO_SORT_FIELDS = ("created_at", "name")
+
+
+def parse_fields(fields, allowed):
+    """Build a Mongo projection from a comma separated ``fields=`` value."""
+    projection = {"_id": 0}
+    if not fields:
+        return projection
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    for field in requested:
+        projection[field] = 1
+    return projection
+
+
+def encode_cursor(document, sort_field, id_field):
+    payload = json.dumps([document.get(sort_field), document[id_field]])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, value_types=(str,)):
+    """Return ``(sort value, id)`` from a cursor made by ``encode_cursor``.
+
+    Cursors come from clients, so anything but a scalar of ``value_types``
+    (or None, for documents missing the sort field) and a string id is
+    rejected rather than spliced into the query.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, list) or len(payload) != 2:
+        raise ValueError("Invalid cursor")
+    value, last_id = payload
+    if isinstance(value, bool) or not (value is None or isinstance(value, value_types)):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, str):
+        raise ValueError("Invalid cursor")
+    return value, last_id
+
+
+def name_filter(name):
+    """Case-insensitive substring match on ``name``."""
+    return {"name": {"$regex": re.escape(name), "$options": "i"}}
+
+
+def range_filter(field, after=None, before=None):
+    bounds = {}
+    if after:
+        bounds["$gte"] = after
+    if before:
+        bounds["$lt"] = before
+    return {field: bounds} if bounds else {}
+
+
+def build_page_query(filters, sort_field, id_field, descending=True, cursor=None):
+    """Return the ``(query, sort)`` pair for one keyset page."""
+    clauses = [clause for clause in filters if clause]
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "$lt" if descending else "$gt"
+        clauses.append({"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, id_field: {op: last_id}},
+        ]})
+    query = {"$and": clauses} if clauses else {}
+    direction = -1 if descending else 1
+    return query, [(sort_field, direction), (id_field, direction)]
+
+
+async def fetch_page(collection, *, filters, projection, sort_field, id_field,
+                     descending=True, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Return ``(documents, next_cursor)`` for one keyset page."""
+    query, sort = build_page_query(filters, sort_field, id_field, descending, cursor)
+
+    if len(projection) > 1:
+        projection = {**projection, sort_field: 1, id_field: 1}
+
+    documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], sort_field, id_field)
+    return documents, next_cursor
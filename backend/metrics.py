@@ -0,0 +1,218 @@
+import bisect
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))  # 1 KiB .. 16 MiB
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = self.header()
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, (("le", _format_number(bound)),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.labelnames, labels, (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{bucket_labels} {series[-1]}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{label_text} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+http_requests_total = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration_seconds = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is fully sent.", ("method", "route"))
+http_response_size_bytes = REGISTRY.histogram(
+    "http_response_size_bytes", "HTTP response body size.", ("route",), SIZE_BUCKETS)
+http_requests_in_flight = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.")
+mongo_operation_duration_seconds = REGISTRY.histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency.", ("collection", "operation"))
+mongo_operation_failures_total = REGISTRY.counter(
+    "mongo_operation_failures_total", "Failed MongoDB commands.", ("collection", "operation"))
+gemini_call_duration_seconds = REGISTRY.histogram(
+    "gemini_call_duration_seconds", "Gemini generate_content latency.", ("model", "outcome"))
+gemini_call_failures_total = REGISTRY.counter(
+    "gemini_call_failures_total", "Failed Gemini generate_content calls.", ("model", "error"))
+collab_editors = REGISTRY.gauge(
+    "collab_editors", "Connected live editing clients.")
+collab_operations_total = REGISTRY.counter(
+    "collab_operations_total", "Live edit operations applied.")
+collab_flushes_total = REGISTRY.counter(
+    "collab_flushes_total", "Writes of buffered live edits by outcome.", ("outcome",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, size and in-flight count.
+
+    Routes are labelled with their path template (``/api/projects/{project_id}``)
+    so ids do not explode the label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_label(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path for route in scope["app"].routes
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = self._route_label(scope)
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, route)
+            http_requests_total.inc(method, route, str(status))
+            http_response_size_bytes.observe(size, route)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every MongoDB command, labelled by collection and command name."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        # getMore names its collection separately from the cursor id
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        target = event.command.get(key)
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_operation_duration_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_operation_duration_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_operation_failures_total.inc(collection, event.command_name)
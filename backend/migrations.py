@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import db
+from listing import LOGO_SORT_FIELDS, PROJECT_SORT_FIELDS
+from search import LOGO_TEXT_WEIGHTS, PROJECT_TEXT_WEIGHTS, text_index
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# serve.py builds indexes once before starting workers and turns this off
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "1") == "1"
+# Seconds between attempts while Mongo is unreachable
+ENSURE_INDEXES_RETRY_DELAY = float(os.getenv("ENSURE_INDEXES_RETRY_DELAY", "5"))
+
+# Every query the API issues must be served by one of these indexes;
+# diagnostics.py verifies that with explain().
+INDEXES = {
+    "projects": [
+        IndexModel([("project_id", ASCENDING)], unique=True, name="project_id_unique"),
+        *(
+            IndexModel([(field, DESCENDING), ("project_id", DESCENDING)], name=f"{field}_project_id")
+            for field in PROJECT_SORT_FIELDS
+        ),
+        text_index(PROJECT_TEXT_WEIGHTS, "project_text"),
+    ],
+    "logos": [
+        IndexModel([("logo_id", ASCENDING)], unique=True, name="logo_id_unique"),
+        *(
+            IndexModel([(field, DESCENDING), ("logo_id", DESCENDING)], name=f"{field}_logo_id")
+            for field in LOGO_SORT_FIELDS
+        ),
+        text_index(LOGO_TEXT_WEIGHTS, "logo_text"),
+    ],
+    "jobs": [
+        IndexModel([("job_id", ASCENDING)], unique=True, name="job_id_unique"),
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+        # Finished jobs expire; queued and running jobs have no finished_at
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=JOB_RETENTION_SECONDS, name="finished_at_ttl"),
+    ],
+    "revisions": [
+        IndexModel([("project_id", ASCENDING), ("version", DESCENDING)], unique=True, name="project_id_version_unique"),
+    ],
+}
+
+
+async def ensure_indexes():
+    """Create any declared index that does not exist yet.
+
+    Indexes are created one at a time so that a failure (for example
+    duplicate ids left over from before the unique index existed) is
+    logged without preventing the remaining indexes from being built.
+    Returns the names of the indexes that could not be created; other
+    errors, such as Mongo being unreachable, are raised.
+    """
+    failed = []
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                logger.error("Could not create index %s.%s: %s", collection_name, name, e)
+                failed.append(f"{collection_name}.{name}")
+    return failed
+
+
+async def ensure_indexes_until_done():
+    """``ensure_indexes``, retried until Mongo answers. Run in the
+    background so the process comes up (and reports not ready) meanwhile.
+    """
+    while True:
+        try:
+            failed = await ensure_indexes()
+        except PyMongoError as e:
+            logger.warning("Could not build indexes, retrying in %.0fs: %s", ENSURE_INDEXES_RETRY_DELAY, e)
+            await asyncio.sleep(ENSURE_INDEXES_RETRY_DELAY)
+            continue
+        if failed:
+            logger.warning("Indexes not created: %s", ", ".join(failed))
+        return failed
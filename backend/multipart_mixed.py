@@ -0,0 +1,46 @@
+import json
+import uuid
+
+from fastapi.responses import Response
+
+from imaging import decode_data_url
+
+MULTIPART_MEDIA_TYPE = "multipart/mixed"
+
+
+def wants_multipart(accept):
+    return MULTIPART_MEDIA_TYPE in (accept or "")
+
+
+def multipart_response(metadata, images):
+    """A ``multipart/mixed`` body: one JSON part with ``metadata`` followed
+    by one raw binary part per image.
+
+    ``images`` is a list of ``(name, data)`` or ``(name, data,
+    content_type)`` where ``data`` is either raw bytes, sent as
+    ``content_type`` (PNG by default), or a ``data:`` URL, which is decoded
+    so the image goes over the wire without base64 overhead.
+    """
+    boundary = uuid.uuid4().hex
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    chunks = [
+        delimiter,
+        b"Content-Type: application/json\r\n\r\n",
+        json.dumps(metadata).encode("utf-8"),
+        b"\r\n",
+    ]
+    for name, data, *content_type in images:
+        if isinstance(data, str):
+            data, content_type = decode_data_url(data)
+        else:
+            content_type = content_type[0] if content_type else "image/png"
+        chunks += [
+            delimiter,
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Disposition: inline; name=\"{name}\"\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("ascii"),
+            data,
+            b"\r\n",
+        ]
+    chunks.append(f"--{boundary}--\r\n".encode("ascii"))
+    return Response(content=b"".join(chunks), media_type=f"{MULTIPART_MEDIA_TYPE}; boundary={boundary}")
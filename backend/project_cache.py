@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+import orjson
+
+from generation_cache import MemoryTier
+
+PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "1024"))
+PROJECT_CACHE_MAX_BYTES = int(os.getenv("PROJECT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROJECT_CACHE_TTL = int(os.getenv("PROJECT_CACHE_TTL", "30"))
+
+
+# Fields read on every request to check that a cached entry is current,
+# including after a write handled by another worker process
+PROJECT_STAMP_PROJECTION = {"_id": 0, "version": 1, "updated_at": 1}
+
+
+def project_stamp(project):
+    # updated_at guards against a deleted and recreated project reusing a version
+    return project.get("version", 0), project.get("updated_at")
+
+
+def project_etag(project, body):
+    # Hash the encoded body too: a deleted and recreated project starts
+    # again at version 0, and must not match an ETag for the old content
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    return f'"v{project.get("version", 0)}-{digest}"'
+
+
+class CachedProject:
+    __slots__ = ("etag", "body", "stamp")
+
+    def __init__(self, etag, body, stamp):
+        self.etag = etag
+        self.body = body
+        self.stamp = stamp
+
+
+class ProjectCache:
+    """Read-through cache of encoded project documents keyed by project_id.
+
+    Entries hold the serialized JSON body and an ETag derived from the
+    project's ``version`` and content, so hits skip both Mongo and
+    encoding. Each worker process has its own cache, so callers pass the
+    project's current stamp (from a ``PROJECT_STAMP_PROJECTION`` lookup)
+    and entries written by an older version are dropped. Writers call
+    ``invalidate``; a read that started before an invalidation is not
+    stored, so a slow ``find_one`` cannot put back a superseded document.
+    """
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale = 0
+        self._generation = 0
+
+    def get(self, project_id, stamp):
+        entry = self.memory.get(project_id)
+        if entry is not None and entry.stamp != stamp:
+            self.stale += 1
+            self.memory.pop(project_id)
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def generation(self):
+        """Token to pass to ``set`` for a read that is about to start."""
+        return self._generation
+
+    def set(self, project_id, project, generation):
+        body = orjson.dumps(project)
+        entry = CachedProject(project_etag(project, body), body, project_stamp(project))
+        if generation == self._generation and self.memory.ttl > 0:
+            self.memory.set(project_id, entry)
+        return entry
+
+    def invalidate(self, *project_ids):
+        self._generation += 1
+        self.invalidations += 1
+        for project_id in project_ids:
+            self.memory.pop(project_id)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "stale": self.stale,
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+            "evictions": self.memory.evictions,
+        }
+
+
+project_cache = ProjectCache(
+    MemoryTier(PROJECT_CACHE_SIZE, PROJECT_CACHE_MAX_BYTES, PROJECT_CACHE_TTL, sizeof=lambda entry: len(entry.body))
+)
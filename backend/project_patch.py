@@ -0,0 +1,171 @@
+from datetime import datetime, timezone
+
+# $slice needs an explicit count; anything past the end returns the rest
+_SLICE_REST = 2 ** 31 - 1
+
+
+def utc_now_iso():
+    """Current time in the same ISO format the frontend sends (``toISOString``)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def version_filter(version):
+    # Projects created before versioning have no version field
+    if version == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": version}
+
+
+def _head(array, index):
+    return {"$slice": [array, index]}
+
+
+def _tail(array, index):
+    return {"$slice": [array, index, _SLICE_REST]}
+
+
+def _insert_expr(array, index, element):
+    if index is None:
+        return {"$concatArrays": [array, [element]]}
+    return {"$concatArrays": [_head(array, index), [element], _tail(array, index)]}
+
+
+def _remove_expr(array, index):
+    return {"$concatArrays": [_head(array, index), _tail(array, {"$add": [index, 1]})]}
+
+
+def _position_expr(operation):
+    if operation.id is not None:
+        return {"$indexOfArray": ["$components.id", operation.id]}
+    return operation.index
+
+
+def _operation_stage(operation):
+    position = _position_expr(operation)
+    if operation.op == "insert":
+        components = _insert_expr("$components", operation.index, {"$literal": operation.component})
+    elif operation.op == "update":
+        components = {"$let": {
+            "vars": {"i": position},
+            "in": {"$concatArrays": [
+                _head("$components", "$$i"),
+                [{"$mergeObjects": [{"$arrayElemAt": ["$components", "$$i"]}, {"$literal": operation.fields}]}],
+                _tail("$components", {"$add": ["$$i", 1]}),
+            ]},
+        }}
+    elif operation.op == "remove":
+        components = {"$let": {"vars": {"i": position}, "in": _remove_expr("$components", "$$i")}}
+    else:  # move
+        components = {"$let": {
+            "vars": {"i": position, "moved": {"$arrayElemAt": ["$components", position]}},
+            "in": {"$let": {
+                "vars": {"rest": _remove_expr("$components", "$$i")},
+                "in": _insert_expr("$$rest", operation.to, "$$moved"),
+            }},
+        }}
+    return {"$set": {"components": components}}
+
+
+def _validate(operations):
+    """Check the operations against each other and return the preconditions
+    the stored project must satisfy: the minimum components length and the
+    component ids that must already exist.
+    """
+    min_length = 0
+    delta = 0
+    required_ids = set()
+    live_ids = {}  # ids inserted or removed earlier in this batch -> still present?
+
+    for number, operation in enumerate(operations):
+        where = f"operation {number} ({operation.op})"
+        if operation.op == "insert":
+            if operation.component is None:
+                raise ValueError(f"{where}: component is required")
+            if operation.index is not None:
+                min_length = max(min_length, operation.index - delta)
+            component_id = operation.component.get("id")
+            if component_id is not None:
+                live_ids[component_id] = True
+            delta += 1
+            continue
+
+        if operation.id is not None:
+            if live_ids.get(operation.id) is False:
+                raise ValueError(f"{where}: component {operation.id} was removed earlier in this patch")
+            if operation.id not in live_ids:
+                required_ids.add(operation.id)
+        elif operation.index is not None:
+            min_length = max(min_length, operation.index - delta + 1)
+        else:
+            raise ValueError(f"{where}: id or index is required")
+
+        if operation.op == "update" and not operation.fields:
+            raise ValueError(f"{where}: fields is required")
+        if operation.op == "remove":
+            if operation.id is not None:
+                live_ids[operation.id] = False
+            delta -= 1
+        if operation.op == "move":
+            if operation.to is None:
+                raise ValueError(f"{where}: to is required")
+            min_length = max(min_length, operation.to - delta + 1)
+
+    return min_length, required_ids
+
+
+def build_patch_update(operations, version, updated_at):
+    """Translate patch operations into ``(filter, pipeline)`` for one atomic
+    ``update_one``. Raises ``ValueError`` for operations that can never apply.
+    """
+    min_length, required_ids = _validate(operations)
+
+    preconditions = [version_filter(version)]
+    if min_length > 0:
+        preconditions.append({f"components.{min_length - 1}": {"$exists": True}})
+    if required_ids:
+        preconditions.append({"components.id": {"$all": sorted(required_ids)}})
+
+    pipeline = [_operation_stage(operation) for operation in operations]
+    pipeline.append({"$set": {
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        "updated_at": {"$literal": updated_at},
+    }})
+    return {"$and": preconditions}, pipeline
+
+
+def _find(components, operation, where):
+    if operation.id is not None:
+        for index, component in enumerate(components):
+            if component.get("id") == operation.id:
+                return index
+        raise ValueError(f"{where}: component {operation.id} does not exist")
+    if operation.index >= len(components):
+        raise ValueError(f"{where}: index {operation.index} is out of range")
+    return operation.index
+
+
+def apply_operations(components, operations):
+    """Apply patch operations in memory, with the same semantics as the
+    pipeline from ``build_patch_update``. Returns a new list and leaves
+    ``components`` untouched; raises ``ValueError`` if any operation fails.
+    """
+    _validate(operations)
+    components = list(components)
+    for number, operation in enumerate(operations):
+        where = f"operation {number} ({operation.op})"
+        if operation.op == "insert":
+            index = len(components) if operation.index is None else operation.index
+            if index > len(components):
+                raise ValueError(f"{where}: index {index} is out of range")
+            components.insert(index, operation.component)
+            continue
+        index = _find(components, operation, where)
+        if operation.op == "update":
+            components[index] = {**components[index], **operation.fields}
+        elif operation.op == "remove":
+            del components[index]
+        else:  # move
+            if operation.to >= len(components):
+                raise ValueError(f"{where}: to {operation.to} is out of range")
+            components.insert(operation.to, components.pop(index))
+    return components
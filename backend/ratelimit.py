@@ -0,0 +1,109 @@
+import math
+import os
+import time
+from collections import OrderedDict
+
+# Token buckets are refilled in variants per second; one request costs as
+# many tokens as the variants it asks for.
+RATE_LIMIT_CLIENT_RATE = float(os.getenv("RATE_LIMIT_CLIENT_RATE", "1"))
+RATE_LIMIT_CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "8"))
+RATE_LIMIT_GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", "10"))
+RATE_LIMIT_GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "40"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Only honour X-Forwarded-For when the backend sits behind a trusted proxy
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+
+class RateLimited(Exception):
+    """Raised when a request must be rejected; ``retry_after`` is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    def headers(self):
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost=1):
+        """Seconds until ``cost`` tokens are available, 0 if they are now."""
+        self._refill()
+        if self.tokens >= cost:
+            return 0.0
+        if cost > self.burst or self.rate <= 0:
+            return math.inf
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost=1):
+        self.tokens -= cost
+
+
+class RateLimiter:
+    """Per-client and global token buckets checked together.
+
+    Tokens are only taken when both buckets can pay, so a client that is
+    over its own limit does not drain the global budget. Client buckets
+    are kept in an LRU so the table stays bounded.
+    """
+
+    def __init__(self, client_rate=RATE_LIMIT_CLIENT_RATE, client_burst=RATE_LIMIT_CLIENT_BURST,
+                 global_rate=RATE_LIMIT_GLOBAL_RATE, global_burst=RATE_LIMIT_GLOBAL_BURST,
+                 max_clients=RATE_LIMIT_MAX_CLIENTS, clock=time.monotonic):
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self._clients = OrderedDict()
+        self.rejected = 0
+
+    def _client_bucket(self, key):
+        bucket = self._clients.get(key)
+        if bucket is None:
+            bucket = self._clients[key] = TokenBucket(self.client_rate, self.client_burst, self.clock)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(key)
+        return bucket
+
+    def acquire(self, key, cost=1, charge_global=True):
+        """Charge ``cost`` tokens to ``key`` or raise ``RateLimited``.
+
+        ``charge_global=False`` only charges the client's bucket, for work
+        that is smoothed some other way, such as queued jobs.
+        """
+        client_bucket = self._client_bucket(key)
+        client_wait = client_bucket.wait_time(cost)
+        global_wait = self.global_bucket.wait_time(cost) if charge_global else 0.0
+        if client_wait or global_wait:
+            self.rejected += 1
+            scope = "client" if client_wait >= global_wait else "global"
+            raise RateLimited(f"Rate limit exceeded ({scope})", min(max(client_wait, global_wait), 3600))
+        client_bucket.take(cost)
+        if charge_global:
+            self.global_bucket.take(cost)
+
+
+def client_key(request):
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+generation_rate_limiter = RateLimiter()
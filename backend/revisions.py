@@ -0,0 +1,176 @@
+import logging
+import os
+
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from project_patch import utc_now_iso
+
+logger = logging.getLogger(__name__)
+
+# A full snapshot is stored at least every this many revisions, bounding
+# reconstruction to one snapshot plus fewer than this many deltas.
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", "20"))
+# Revisions kept per project; older ones are pruned back to a snapshot
+REVISION_RETENTION = int(os.getenv("REVISION_RETENTION", "500"))
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+REVISION_FIELDS = {"_id": 0, "version": 1, "kind": 1, "name": 1, "created_at": 1, "size": 1}
+
+
+def _ids(components):
+    ids = [component.get("id") if isinstance(component, dict) else None for component in components]
+    if None in ids or len(set(ids)) != len(ids):
+        return None
+    return ids
+
+
+def diff_components(old, new):
+    """Component-level delta from ``old`` to ``new``, keyed by component id.
+
+    Returns ``None`` when either list has components without unique ids,
+    in which case a snapshot must be stored instead.
+    """
+    old_ids, new_ids = _ids(old), _ids(new)
+    if old_ids is None or new_ids is None:
+        return None
+    old_by_id = dict(zip(old_ids, old))
+    new_id_set = set(new_ids)
+
+    changed = [component for component in new if old_by_id.get(component["id"]) != component]
+    removed = [component_id for component_id in old_ids if component_id not in new_id_set]
+    # Order only needs storing when it differs from "kept in place, added at the end"
+    implied_order = [component_id for component_id in old_ids if component_id in new_id_set]
+    implied_order += [component_id for component_id in new_ids if component_id not in old_by_id]
+    return {"set": changed, "remove": removed, "order": None if implied_order == new_ids else new_ids}
+
+
+def apply_delta(components, delta):
+    by_id = {component["id"]: component for component in components}
+    for component_id in delta["remove"]:
+        by_id.pop(component_id, None)
+    order = [component["id"] for component in components if component["id"] in by_id]
+    for component in delta["set"]:
+        if component["id"] not in by_id:
+            order.append(component["id"])
+        by_id[component["id"]] = component
+    if delta.get("order") is not None:
+        order = delta["order"]
+    return [by_id[component_id] for component_id in order]
+
+
+def _size(value):
+    # Rough stored size, reported so clients can see what history costs
+    return len(repr(value))
+
+
+class RevisionStore:
+    """History of each project's components as snapshots and deltas.
+
+    Every save records the new state as a delta against the previous
+    revision, or as a full snapshot when the previous revision is not
+    available, the interval since the last snapshot is reached, or the
+    delta would not be smaller than the snapshot.
+    """
+
+    def __init__(self, collection, snapshot_interval=REVISION_SNAPSHOT_INTERVAL, retention=REVISION_RETENTION):
+        self.collection = collection
+        self.snapshot_interval = snapshot_interval
+        self.retention = retention
+
+    async def _chain(self, project_id, version):
+        """Revisions from the last snapshot at or before ``version`` up to it."""
+        cursor = self.collection.find(
+            {"project_id": project_id, "version": {"$lte": version, "$gt": version - self.snapshot_interval}},
+            {"_id": 0},
+        ).sort("version", DESCENDING)
+        chain = []
+        async for revision in cursor:
+            # Versions must be contiguous back to the snapshot
+            if revision["version"] != version - len(chain):
+                return None
+            chain.append(revision)
+            if revision["kind"] == SNAPSHOT:
+                chain.reverse()
+                return chain
+        return None
+
+    async def reconstruct(self, project_id, version):
+        """Return the revision document for ``version`` with its full
+        ``components``, or ``None`` if it is not in the history.
+        """
+        chain = await self._chain(project_id, version)
+        if chain is None:
+            return None
+        components = chain[0]["components"]
+        for revision in chain[1:]:
+            components = apply_delta(components, revision["delta"])
+        latest = chain[-1]
+        return {
+            "project_id": project_id,
+            "version": version,
+            "name": latest.get("name"),
+            "created_at": latest.get("created_at"),
+            "components": components,
+        }
+
+    async def record(self, project_id, version, name, components):
+        """Store the state a write produced. Failures are logged, not raised,
+        so history problems never fail the write itself.
+        """
+        try:
+            revision = {
+                "project_id": project_id,
+                "version": version,
+                "name": name,
+                "created_at": utc_now_iso(),
+            }
+            chain = await self._chain(project_id, version - 1) if version > 0 else None
+            delta = None
+            # A full chain means the snapshot is interval - 1 revisions back
+            if chain is not None and len(chain) < self.snapshot_interval:
+                previous = chain[0]["components"]
+                for step in chain[1:]:
+                    previous = apply_delta(previous, step["delta"])
+                delta = diff_components(previous, components)
+            if delta is not None and _size(delta) < _size(components):
+                revision.update(kind=DELTA, delta=delta, size=_size(delta))
+            else:
+                revision.update(kind=SNAPSHOT, components=components, size=_size(components))
+            await self.collection.insert_one(revision)
+            if self.retention and version % self.snapshot_interval == 0:
+                await self.prune(project_id, version)
+        except DuplicateKeyError:
+            pass
+        except Exception:
+            logger.exception("Could not record revision %s of project %s", version, project_id)
+
+    async def prune(self, project_id, latest_version):
+        """Drop revisions older than the retention window, keeping the
+        snapshot the oldest retained revision is reconstructed from.
+        """
+        cutoff = latest_version - self.retention
+        if cutoff <= 0:
+            return
+        base = await self.collection.find_one(
+            {"project_id": project_id, "version": {"$lte": cutoff}, "kind": SNAPSHOT},
+            {"_id": 0, "version": 1},
+            sort=[("version", DESCENDING)],
+        )
+        if base is not None:
+            await self.collection.delete_many({"project_id": project_id, "version": {"$lt": base["version"]}})
+
+    async def list(self, project_id, before=None, limit=50):
+        query = {"project_id": project_id}
+        if before is not None:
+            query["version"] = {"$lt": before}
+        cursor = self.collection.find(query, REVISION_FIELDS).sort("version", DESCENDING).limit(limit + 1)
+        revisions = await cursor.to_list(length=limit + 1)
+        next_before = revisions[limit - 1]["version"] if len(revisions) > limit else None
+        return revisions[:limit], next_before
+
+    async def delete(self, project_id):
+        await self.collection.delete_many({"project_id": project_id})
+
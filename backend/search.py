@@ -0,0 +1,75 @@
+from pymongo import TEXT, IndexModel
+
+from listing import decode_cursor, encode_cursor
+
+# Text indexed fields and their weights. A collection can only have one
+# text index, so every searchable field is listed here; image data and
+# styles are deliberately left out.
+PROJECT_TEXT_WEIGHTS = {
+    "name": 10,
+    "components.props.content": 2,
+    "components.props.title": 2,
+    "components.props.text": 1,
+    "components.props.caption": 1,
+    "components.props.alt": 1,
+}
+LOGO_TEXT_WEIGHTS = {"name": 10, "prompt": 3}
+
+# Light results by default; fields= can ask for more
+PROJECT_SEARCH_FIELDS = "project_id,name,updated_at"
+LOGO_SEARCH_FIELDS = "logo_id,name,prompt,created_at,image_sha256,thumbnails"
+
+MAX_QUERY_LENGTH = 200
+
+
+def text_index(weights, name):
+    # Documents never carry a language, so do not let a "language" key in
+    # component props switch the stemmer
+    return IndexModel(
+        [(field, TEXT) for field in weights],
+        weights=weights,
+        name=name,
+        default_language="english",
+        language_override="search_language",
+    )
+
+
+def build_search_pipeline(q, filters, projection, id_field, limit, cursor=None):
+    """Aggregation for one page of ``$text`` matches, best first.
+
+    Pages are keyed on ``(score, id)`` like the listings are on
+    ``(sort value, id)``, so deep pages cost no more than the first.
+    """
+    match = {"$text": {"$search": q}}
+    for clause in filters:
+        match.update(clause)
+    pipeline = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+    if cursor:
+        score, last_id = decode_cursor(cursor, (int, float))
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, id_field: {"$lt": last_id}},
+        ]}})
+    pipeline.append({"$sort": {"score": -1, id_field: -1}})
+    pipeline.append({"$limit": limit + 1})
+    if len(projection) > 1:
+        projection = {**projection, "score": 1, id_field: 1}
+    pipeline.append({"$project": projection})
+    return pipeline
+
+
+async def search_page(collection, q, *, filters, projection, id_field, limit, cursor=None):
+    """Return ``(documents, next_cursor)`` for one page of search results."""
+    q = q.strip()
+    if not q:
+        raise ValueError("q must not be empty")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {MAX_QUERY_LENGTH} characters")
+    pipeline = build_search_pipeline(q, [clause for clause in filters if clause], projection, id_field, limit, cursor)
+    documents = await collection.aggregate(pipeline).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], "score", id_field)
+    return documents, next_cursor
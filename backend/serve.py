@@ -0,0 +1,95 @@
+"""Production entry point: several uvicorn worker processes on one port.
+
+Workers are started with the ``spawn`` method, so each one imports the
+app from scratch and shares nothing with the parent or its siblings.
+Clients, pools, caches, rate limits and metrics are therefore per
+worker; the Mongo-backed job queue is shared. Live editors on different
+workers see each other's edits through a Mongo change stream; when Mongo
+cannot provide one (standalone mongod, or unreachable at startup) a
+single worker is run instead.
+
+    WEB_CONCURRENCY=4 python serve.py
+"""
+import asyncio
+import logging
+import os
+
+import uvicorn
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8001"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+# Requests per worker before it is recycled, 0 to never recycle
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "0")) or None
+# How long to wait for Mongo before leaving index creation to the workers
+INDEX_PING_TIMEOUT = float(os.getenv("INDEX_PING_TIMEOUT", "5"))
+# Set to 0 to run WEB_CONCURRENCY workers even when live editors on
+# different workers could not see each other's edits
+COLLAB_SINGLE_WORKER_FALLBACK = os.getenv("COLLAB_SINGLE_WORKER_FALLBACK", "1") == "1"
+
+logger = logging.getLogger("serve")
+
+
+def prepare_mongo(build_indexes):
+    """Check Mongo once before the workers start and, if ``build_indexes``,
+    create indexes here instead of in every worker.
+
+    Returns ``(indexes_built, change_streams)``. Both are False when Mongo
+    could not be reached; the workers then keep retrying the indexes in
+    the background instead of the server not starting.
+    """
+    from pymongo.errors import PyMongoError
+
+    import database
+    from migrations import ensure_indexes
+
+    async def prepare():
+        await database.ping(INDEX_PING_TIMEOUT)
+        hello = await database.client.admin.command("hello")
+        # Change streams need a replica set or a sharded cluster (mongos)
+        change_streams = "setName" in hello or hello.get("msg") == "isdbgrid"
+        return change_streams, await ensure_indexes() if build_indexes else []
+
+    try:
+        change_streams, failed = asyncio.run(prepare())
+    except (PyMongoError, asyncio.TimeoutError) as e:
+        logger.warning("Mongo unavailable, workers will build indexes: %r", e)
+        return False, False
+    finally:
+        database.close()
+    if failed:
+        logger.warning("Indexes not created: %s", ", ".join(failed))
+    return build_indexes, change_streams
+
+
+def worker_count(change_streams):
+    if WEB_CONCURRENCY > 1 and COLLAB_SINGLE_WORKER_FALLBACK and not change_streams:
+        logger.warning("Live edits cannot be shared between workers without Mongo change streams; "
+                       "running 1 worker instead of %d", WEB_CONCURRENCY)
+        return 1
+    return WEB_CONCURRENCY
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    indexes_built, change_streams = prepare_mongo(os.getenv("ENSURE_INDEXES_ON_STARTUP", "1") == "1")
+    if indexes_built:
+        # Inherited by the spawned workers
+        os.environ["ENSURE_INDEXES_ON_STARTUP"] = "0"
+    if os.getenv("COLLAB_CHANGE_STREAMS", "1") != "1":
+        change_streams = False
+    uvicorn.run(
+        "server:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=HOST,
+        port=PORT,
+        workers=worker_count(change_streams),
+        proxy_headers=True,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        limit_max_requests=WORKER_MAX_REQUESTS,
+    )
+
+
+if __name__ == "__main__":
+    main()
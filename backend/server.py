@@ -1,22 +1,87 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
 import os
 from dotenv import load_dotenv
-import pymongo
-from pymongo import MongoClient
 import uuid
 import base64
 import asyncio
-import google.generativeai as genai
-from PIL import Image
-import io
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from contextlib import asynccontextmanager
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import database
+from database import projects_collection, logos_collection, jobs_collection, revisions_collection
+from migrations import ENSURE_INDEXES_ON_STARTUP, ensure_indexes_until_done
+from generation import (
+    GEMINI_MODEL_NAME, GENERATION_GLOBAL_CONCURRENCY, GENERATION_MAX_VARIANTS, IMAGE_GENERATION_CONFIG,
+    admit, coalesce, generate_variants, in_flight, upstream_calls,
+)
+from ratelimit import RATE_LIMIT_CLIENT_BURST, RateLimited, client_key, generation_rate_limiter
+from clients import clients
+from generation_cache import cache_key, generation_cache
+from project_cache import PROJECT_STAMP_PROJECTION, project_cache, project_stamp
+from site_renderer import ASSET_EXTENSIONS, SiteRenderer, parse_asset_name, site_cache, site_cache_key, site_etag
+from uploads import UploadTooLarge, receive_asset
+from jobs import JobQueue
+from revisions import RevisionStore
+from collab import CollabHub
+from compression import CompressionMiddleware
+from multipart_mixed import wants_multipart, multipart_response
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware
+from blobstore import blob_store
+from blob_http import blob_response, etag_matches
+from imaging import decode_data_url, make_thumbnails, process_image, process_data_url, run_in_process_pool, shutdown_process_pool
+from streaming import negotiate_stream_format, variant_events, cached_events, streaming_response
+from project_patch import build_patch_update, utc_now_iso
+from bulk import bulk_import, export_ndjson
+from search import LOGO_SEARCH_FIELDS, PROJECT_SEARCH_FIELDS, search_page
+from listing import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PROJECT_FIELDS, PROJECT_SORT_FIELDS,
+    LOGO_FIELDS, LOGO_SORT_FIELDS, parse_fields, name_filter, range_filter, fetch_page,
+)
 
 load_dotenv()
 
-app = FastAPI(title="Website Builder API")
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+# Threads behind asyncio.to_thread: blocking Gemini calls plus file and
+# rendering work. The asyncio default, min(32, cpus + 4), would cap
+# Gemini calls below GENERATION_GLOBAL_CONCURRENCY on small machines.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "0")) or GENERATION_GLOBAL_CONCURRENCY + 8
+
+# Runs once in every worker process, after it has been spawned, so each
+# worker builds its own clients, pools and job workers.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(THREAD_POOL_SIZE))
+    # Index builds wait for Mongo in the background; until it answers the
+    # worker is live but not ready
+    build_indexes = asyncio.create_task(ensure_indexes_until_done()) if ENSURE_INDEXES_ON_STARTUP else None
+    # Importing and configuring the Gemini SDK is the slowest part of
+    # startup; do it in a thread so liveness is answered meanwhile.
+    # Readiness waits for it.
+    warm_up = asyncio.create_task(asyncio.to_thread(clients.start))
+    await job_queue.start()
+    collab_hub.start()
+    yield
+    # A failed warm-up is retried, and reported, by the first Gemini call
+    await asyncio.gather(warm_up, return_exceptions=True)
+    if build_indexes is not None:
+        build_indexes.cancel()
+        await asyncio.gather(build_indexes, return_exceptions=True)
+    await collab_hub.close()
+    await job_queue.stop()
+    clients.close()
+    shutdown_process_pool()
+    database.close()
+
+job_queue = JobQueue(jobs_collection, blob_store=blob_store)
+revision_store = RevisionStore(revisions_collection)
+
+app = FastAPI(title="Website Builder API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -27,17 +92,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB connection
-MONGO_URL = os.getenv("MONGO_URL")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# gzip/brotli for JSON responses, negotiated from Accept-Encoding
+app.add_middleware(CompressionMiddleware)
 
-client = MongoClient(MONGO_URL)
-db = client.websitebuilder
-projects_collection = db.projects
-logos_collection = db.logos
+# Request metrics, outermost so the latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
 
-# Initialize Gemini AI
-genai.configure(api_key=GEMINI_API_KEY)
 
 # Pydantic models
 class WebsiteProject(BaseModel):
@@ -46,6 +106,30 @@ class WebsiteProject(BaseModel):
     components: List[dict]
     created_at: str
     updated_at: str
+    version: int = 0
+
+class PatchOperation(BaseModel):
+    op: Literal["insert", "update", "remove", "move"]
+    id: Optional[str] = None  # target component by id...
+    index: Optional[int] = Field(None, ge=0)  # ...or by position
+    component: Optional[dict] = None  # insert
+    fields: Optional[dict] = None  # update, merged into the component
+    to: Optional[int] = Field(None, ge=0)  # move
+
+class ProjectPatch(BaseModel):
+    version: int
+    operations: List[PatchOperation] = Field(..., min_length=1)
+    updated_at: Optional[str] = None
+
+class ImageOutputOptions(BaseModel):
+    format: Literal["png", "webp"] = "png"
+    width: Optional[int] = Field(None, ge=1, le=4096)
+    height: Optional[int] = Field(None, ge=1, le=4096)
+    quality: int = Field(85, ge=1, le=100)  # webp only
+
+class BulkProjects(BaseModel):
+    projects: List[Any]  # validated one by one so errors are reported per item
+    mode: Literal["insert", "upsert"] = "insert"
 
 class LogoProject(BaseModel):
     logo_id: str
@@ -53,153 +137,709 @@ class LogoProject(BaseModel):
     prompt: str
     image_data: str  # base64 encoded
     created_at: str
+    output: Optional[ImageOutputOptions] = None  # re-encode before storing
+
+# More variants than a client's token bucket holds could never be admitted
+MAX_VARIANTS = min(GENERATION_MAX_VARIANTS, int(RATE_LIMIT_CLIENT_BURST))
 
 class ImageGenerationRequest(BaseModel):
     prompt: str
-    count: Optional[int] = 1
+    count: int = Field(1, ge=1, le=MAX_VARIANTS)
+    output: Optional[ImageOutputOptions] = None  # post-process generated images
+    background: bool = False  # queue as a job and return its id
+    priority: int = 0
 
 class LogoGenerationRequest(BaseModel):
     company_name: str
     style: str
     colors: Optional[str] = ""
     industry: Optional[str] = ""
+    output: Optional[ImageOutputOptions] = None  # post-process generated images
+    background: bool = False  # queue as a job and return its id
+    priority: int = 0
 
-# Health check
+# Health checks. Liveness only says the process serves requests;
+# readiness also checks the dependencies a request needs.
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "message": "Website Builder API is running"}
 
+@app.get("/api/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness():
+    checks = {"job_queue": "ok" if job_queue.running else "stopped", "gemini": clients.status()}
+    try:
+        await database.ping(READINESS_TIMEOUT)
+        checks["mongo"] = "ok"
+    except Exception as e:
+        # Only the error type: this endpoint is unauthenticated
+        checks["mongo"] = type(e).__name__
+    ready = all(value == "ok" for value in checks.values())
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks},
+    )
+
 # Website Builder endpoints
 @app.post("/api/projects")
 async def create_project(project: WebsiteProject):
     try:
         project_dict = project.dict()
-        projects_collection.insert_one(project_dict)
+        project_dict["version"] = 0
+        await projects_collection.insert_one(project_dict)
+        await revision_store.record(project.project_id, 0, project.name, project.components)
         return {"message": "Project created successfully", "project_id": project.project_id}
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Project already exists")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/projects")
-async def get_projects():
+async def get_projects(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: str = "updated_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    name: Optional[str] = None,
+    updated_after: Optional[str] = None,
+    updated_before: Optional[str] = None,
+):
     try:
-        projects = list(projects_collection.find({}, {"_id": 0}))
-        return {"projects": projects}
+        if sort not in PROJECT_SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        projects, next_cursor = await fetch_page(
+            projects_collection,
+            filters=[
+                name_filter(name) if name else {},
+                range_filter("updated_at", updated_after, updated_before),
+            ],
+            projection=parse_fields(fields, PROJECT_FIELDS),
+            sort_field=sort,
+            id_field="project_id",
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+        )
+        return {"projects": projects, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/projects/bulk")
+async def bulk_create_projects(bulk: BulkProjects):
+    try:
+        if bulk.mode == "insert":
+            for item in bulk.projects:
+                if isinstance(item, dict):
+                    item["version"] = 0
+        result = await bulk_import(projects_collection, bulk.projects, WebsiteProject, "project_id", bulk.mode)
+        if bulk.mode == "upsert":
+            project_cache.invalidate(*(item["project_id"] for item in bulk.projects
+                                       if isinstance(item, dict) and "project_id" in item))
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/export")
+async def export_projects(updated_after: Optional[str] = None):
+    # Declared before /api/projects/{project_id} so "export" is not taken as an id
+    query = range_filter("updated_at", updated_after)
+    return StreamingResponse(
+        export_ndjson(projects_collection, query, sort=[("project_id", 1)]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="projects.ndjson"'},
+    )
+
+@app.get("/api/projects/search")
+async def search_projects(
+    q: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    updated_after: Optional[str] = None,
+    updated_before: Optional[str] = None,
+):
+    try:
+        # Ranked by text score over the name and component text
+        projects, next_cursor = await search_page(
+            projects_collection,
+            q,
+            filters=[range_filter("updated_at", updated_after, updated_before)],
+            projection=parse_fields(fields or PROJECT_SEARCH_FIELDS, PROJECT_FIELDS),
+            id_field="project_id",
+            limit=limit,
+            cursor=cursor,
+        )
+        return {"projects": projects, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/projects/{project_id}")
-async def get_project(project_id: str):
+async def get_project(project_id: str, request: Request):
     try:
-        project = projects_collection.find_one({"project_id": project_id}, {"_id": 0})
-        if not project:
+        # A hit still costs one small lookup so writes from other workers are seen
+        current = await projects_collection.find_one({"project_id": project_id}, PROJECT_STAMP_PROJECTION)
+        if not current:
             raise HTTPException(status_code=404, detail="Project not found")
-        return project
+        cached = project_cache.get(project_id, project_stamp(current))
+        if cached is None:
+            generation = project_cache.generation()
+            project = await projects_collection.find_one({"project_id": project_id}, {"_id": 0})
+            if not project:
+                raise HTTPException(status_code=404, detail="Project not found")
+            cached = project_cache.set(project_id, project, generation)
+        # Clients must revalidate, which costs a 304 when nothing changed
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(cached.body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/projects/{project_id}")
 async def update_project(project_id: str, project: WebsiteProject):
     try:
-        project_dict = project.dict()
-        result = projects_collection.update_one(
+        project_dict = project.dict(exclude={"version"})
+        result = await projects_collection.find_one_and_update(
             {"project_id": project_id}, 
-            {"$set": project_dict}
+            {"$set": project_dict, "$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER,
         )
-        if result.matched_count == 0:
+        project_cache.invalidate(project_id)
+        if result is None:
             raise HTTPException(status_code=404, detail="Project not found")
-        return {"message": "Project updated successfully"}
+        await revision_store.record(project_id, result["version"], project.name, project.components)
+        return {"message": "Project updated successfully", "version": result["version"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.patch("/api/projects/{project_id}")
+async def patch_project(project_id: str, patch: ProjectPatch):
+    try:
+        # Apply all operations in one atomic pipeline update, guarded by version
+        query, pipeline = build_patch_update(patch.operations, patch.version, patch.updated_at or utc_now_iso())
+        result = await projects_collection.find_one_and_update(
+            {"project_id": project_id, **query},
+            pipeline,
+            projection={"_id": 0, "version": 1, "name": 1, "components": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        project_cache.invalidate(project_id)
+        if result is None:
+            current = await projects_collection.find_one({"project_id": project_id}, {"_id": 0, "version": 1})
+            if not current:
+                raise HTTPException(status_code=404, detail="Project not found")
+            if current.get("version", 0) != patch.version:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Version conflict: project is at version {current.get('version', 0)}",
+                )
+            raise ValueError("Operations reference components that do not exist")
+        await revision_store.record(project_id, result["version"], result["name"], result["components"])
+        return {"message": "Project patched successfully", "version": result["version"]}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/projects/{project_id}")
 async def delete_project(project_id: str):
     try:
-        result = projects_collection.delete_one({"project_id": project_id})
+        result = await projects_collection.delete_one({"project_id": project_id})
+        project_cache.invalidate(project_id)
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Project not found")
+        await revision_store.delete(project_id)
         return {"message": "Project deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Live collaborative editing
+async def save_live_edits(project_id, version, name, components):
+    project_cache.invalidate(project_id)
+    await revision_store.record(project_id, version, name, components)
+
+collab_hub = CollabHub(projects_collection, PatchOperation, on_flush=save_live_edits)
+
+@app.websocket("/api/projects/{project_id}/live")
+async def live_edit(websocket: WebSocket, project_id: str):
+    # Edits are broadcast immediately and written in batches; see collab.py
+    await collab_hub.serve(websocket, project_id)
+
+# Revision history
+@app.get("/api/projects/{project_id}/revisions")
+async def list_revisions(
+    project_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+):
+    try:
+        revisions, next_before = await revision_store.list(project_id, before, limit)
+        return {"revisions": revisions, "next_before": next_before}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/{project_id}/revisions/{version}")
+async def get_revision(project_id: str, version: int):
+    try:
+        revision = await revision_store.reconstruct(project_id, version)
+        if revision is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        return revision
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/projects/{project_id}/revisions/{version}/restore")
+async def restore_revision(project_id: str, version: int):
+    try:
+        revision = await revision_store.reconstruct(project_id, version)
+        if revision is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        # Restoring is a new save, so it can be undone as well
+        result = await projects_collection.find_one_and_update(
+            {"project_id": project_id},
+            {"$set": {"name": revision["name"], "components": revision["components"], "updated_at": utc_now_iso()},
+             "$inc": {"version": 1}},
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        project_cache.invalidate(project_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        await revision_store.record(project_id, result["version"], revision["name"], revision["components"])
+        return {"message": "Revision restored successfully", "version": result["version"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Static site export
+site_renderer = SiteRenderer(blob_store)
+
+@app.get("/api/projects/{project_id}/site")
+async def get_project_site(project_id: str, request: Request, download: bool = False):
+    try:
+        # Renders are cached per version, so a hit costs one small lookup
+        current = await projects_collection.find_one(
+            {"project_id": project_id}, {"_id": 0, "project_id": 1, "version": 1, "updated_at": 1}
+        )
+        if not current:
+            raise HTTPException(status_code=404, detail="Project not found")
+        key = site_cache_key(current)
+        html = site_cache.get(key)
+        if html is None:
+            project = await projects_collection.find_one({"project_id": project_id}, {"_id": 0})
+            if not project:
+                raise HTTPException(status_code=404, detail="Project not found")
+            html = await asyncio.to_thread(site_renderer.render, project)
+            # Key by what was rendered in case the project changed in between
+            key = site_cache_key(project)
+            site_cache.set(key, html)
+        
+        headers = {"ETag": site_etag(key), "Cache-Control": "no-cache"}
+        if download:
+            headers["Content-Disposition"] = f'attachment; filename="{project_id}.html"'
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(html, media_type="text/html", headers=headers)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/assets/{name}")
+@app.get("/api/sites/assets/{name}")
+async def get_site_asset(name: str, request: Request):
+    try:
+        digest, content_type = parse_asset_name(name)
+        if not await asyncio.to_thread(blob_store.exists, digest):
+            raise ValueError(f"Unknown asset {name}")
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Asset names are content hashes, so they never change
+    return await blob_response(request, blob_store, digest, content_type, "public, max-age=31536000, immutable")
+
+# Uploaded assets
+@app.post("/api/assets")
+async def upload_asset(request: Request):
+    # Parsed from the raw body stream rather than UploadFile, which would
+    # spool the whole file before the size limit could be checked
+    try:
+        digest, size, content_type, created = await receive_asset(request, blob_store)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ORJSONResponse(
+        status_code=201 if created else 200,
+        content={
+            "url": f"/api/assets/{digest}.{ASSET_EXTENSIONS[content_type]}",
+            "sha256": digest,
+            "size": size,
+            "content_type": content_type,
+            "deduplicated": not created,
+        },
+    )
+
+# AI generation helpers, shared by the endpoints and the job queue
+def build_logo_prompt(request: LogoGenerationRequest):
+    # Create detailed prompt for logo generation
+    prompt = f"Create a modern professional logo for {request.company_name}"
+    if request.style:
+        prompt += f" in {request.style} style"
+    if request.colors:
+        prompt += f" using {request.colors} colors"
+    if request.industry:
+        prompt += f" suitable for {request.industry} industry"
+    prompt += ", clean background, high quality, professional design"
+    return prompt
+
+async def gemini_model():
+    # Before the lifespan warm-up has loaded the SDK, wait for it in a
+    # thread: importing it, or waiting on its lock, would block the loop
+    if not clients.started:
+        await asyncio.to_thread(clients.start)
+    return clients.model(GEMINI_MODEL_NAME)
+
+async def run_generation(prompt, count, charge=None):
+    """Generate ``count`` images for ``prompt``, going through the cache.
+    
+    ``await charge(count)`` runs, and may raise ``RateLimited``, only when
+    the request is about to call Gemini itself.
+    Returns ``(images, errors, cached)``; raises when every variant failed.
+    """
+    # Serve identical requests from the generation cache
+    key = cache_key(prompt, GEMINI_MODEL_NAME, IMAGE_GENERATION_CONFIG, count)
+    cached = await generation_cache.get(key)
+    if cached is not None:
+        return cached, [], True
+    if charge is not None and not in_flight(key):
+        await charge(count)
+    
+    # Generate the requested variants in as few upstream calls as the
+    # model allows; identical requests already running share those calls
+    model = await gemini_model()
+    async def generate():
+        images, errors = await generate_variants(model, prompt, count)
+        # A short result would be served to every identical request
+        if not errors and len(images) >= count:
+            await generation_cache.set(key, images)
+        return images, errors
+    images, errors = await coalesce(key, generate)
+    if errors and not images:
+        raise RuntimeError(errors[0])
+    return images, errors, False
+
+def output_transform(output: Optional[ImageOutputOptions]):
+    """Per-image post-processing coroutine for ``output``, or None."""
+    if output is None:
+        return None
+    options = output.dict()
+    async def transform(image):
+        return await process_data_url(image, **options)
+    return transform
+
+async def postprocess(images, output: Optional[ImageOutputOptions]):
+    # The cache keeps the original images; post-processing runs per request
+    transform = output_transform(output)
+    if transform is None:
+        return images
+    return list(await asyncio.gather(*(transform(image) for image in images)))
+
+async def stream_generation(prompt, count, stream_format, output=None, extra=None, charge=None):
+    """Streaming response for a generation; ``extra`` fields go on every
+    event and ``charge`` is as for ``run_generation``.
+    """
+    extra = extra or {}
+    transform = output_transform(output)
+    cached = await generation_cache.get(cache_key(prompt, GEMINI_MODEL_NAME, IMAGE_GENERATION_CONFIG, count))
+    if cached is not None:
+        return streaming_response(cached_events(cached, transform), stream_format, **extra)
+    if charge is not None:
+        await charge(count)
+    # Stream each image as soon as its call returns. Streamed results
+    # are not cached since that would hold every variant in memory.
+    model = await gemini_model()
+    return streaming_response(variant_events(model, prompt, count, transform), stream_format, **extra)
+
+async def image_job(params):
+    request = ImageGenerationRequest(**params)
+    images, errors, cached = await run_generation(request.prompt, request.count)
+    images = await postprocess(images, request.output)
+    return {"images": images, "errors": errors, "cached": cached}
+
+async def logo_job(params):
+    request = LogoGenerationRequest(**params)
+    prompt = build_logo_prompt(request)
+    logos, errors, cached = await run_generation(prompt, 4)
+    logos = await postprocess(logos, request.output)
+    return {"logos": logos, "prompt": prompt, "errors": errors, "cached": cached}
+
+job_queue.register("generate-image", image_job)
+job_queue.register("generate-logo", logo_job)
+
+async def admit_generation(raw_request: Request, cost):
+    # Called only for requests about to call Gemini: cache hits and
+    # requests joining an identical running generation are free, and
+    # queued jobs go through charge_job instead. Shed load when
+    # this worker's Gemini backlog (in upstream calls) is too deep, then
+    # charge the per-client and global token buckets per variant; a shed
+    # request is not charged.
+    admit(upstream_calls(await gemini_model(), cost))
+    generation_rate_limiter.acquire(client_key(raw_request), cost)
+
+def charge_job(raw_request: Request, cost):
+    # Queued jobs skip the global bucket and the backlog check, the job
+    # workers smooth them out, but still spend the client's own tokens so
+    # background=true is not a way around its rate limit
+    generation_rate_limiter.acquire(client_key(raw_request), cost, charge_global=False)
+
+def job_accepted(job_id):
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"},
+    )
+
 # AI Image Generation endpoints
 @app.post("/api/generate-image")
-async def generate_image(request: ImageGenerationRequest):
+async def generate_image(request: ImageGenerationRequest, raw_request: Request):
     try:
-        # Use the Gemini model for image generation
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Generate images based on the prompt
-        images = []
-        for _ in range(request.count):
-            response = model.generate_content(
-                request.prompt,
-                generation_config={"response_mime_type": "image/png"}
+        if request.background:
+            job_id = await job_queue.submit(
+                "generate-image", request.dict(exclude={"background", "priority"}), request.priority,
+                charge=partial(charge_job, raw_request, request.count),
             )
-            
-            # Extract image data from response
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    image_bytes = part.inline_data.data
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    images.append(f"data:image/png;base64,{base64_image}")
+            return job_accepted(job_id)
+        
+        charge = partial(admit_generation, raw_request)
+        stream_format = negotiate_stream_format(raw_request.headers.get("accept"))
+        if stream_format:
+            return await stream_generation(request.prompt, request.count, stream_format, request.output, charge=charge)
         
-        return {"images": images}
+        images, errors, cached = await run_generation(request.prompt, request.count, charge)
+        images = await postprocess(images, request.output)
+        if wants_multipart(raw_request.headers.get("accept")):
+            return multipart_response(
+                {"errors": errors, "cached": cached},
+                [(f"image-{index}", image) for index, image in enumerate(images)],
+            )
+        return {"images": images, "errors": errors, "cached": cached}
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers=e.headers())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image generation failed: {str(e)}")
 
 # Logo Generation endpoints
 @app.post("/api/generate-logo")
-async def generate_logo(request: LogoGenerationRequest):
-    try:
-        # Create detailed prompt for logo generation
-        prompt = f"Create a modern professional logo for {request.company_name}"
-        if request.style:
-            prompt += f" in {request.style} style"
-        if request.colors:
-            prompt += f" using {request.colors} colors"
-        if request.industry:
-            prompt += f" suitable for {request.industry} industry"
-        prompt += ", clean background, high quality, professional design"
+async def generate_logo(request: LogoGenerationRequest, raw_request: Request):
+    try:
+        if request.background:
+            job_id = await job_queue.submit(
+                "generate-logo", request.dict(exclude={"background", "priority"}), request.priority,
+                charge=partial(charge_job, raw_request, 4),
+            )
+            return job_accepted(job_id)
         
-        # Use the Gemini model for logo generation
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        prompt = build_logo_prompt(request)
+        charge = partial(admit_generation, raw_request)
+        stream_format = negotiate_stream_format(raw_request.headers.get("accept"))
+        if stream_format:
+            return await stream_generation(prompt, 4, stream_format, request.output, {"prompt": prompt}, charge)
         
-        # Generate logos based on the prompt
-        logos = []
-        for _ in range(4):  # Generate 4 logo variations
-            response = model.generate_content(
-                prompt,
-                generation_config={"response_mime_type": "image/png"}
+        # Generate 4 logo variations
+        logos, errors, cached = await run_generation(prompt, 4, charge)
+        logos = await postprocess(logos, request.output)
+        if wants_multipart(raw_request.headers.get("accept")):
+            return multipart_response(
+                {"prompt": prompt, "errors": errors, "cached": cached},
+                [(f"logo-{index}", logo) for index, logo in enumerate(logos)],
             )
-            
-            # Extract image data from response
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    image_bytes = part.inline_data.data
-                    base64_image = base64.b64encode(image_bytes).decode('utf-8')
-                    logos.append(f"data:image/png;base64,{base64_image}")
-        
-        return {"logos": logos, "prompt": prompt}
+        return {"logos": logos, "prompt": prompt, "errors": errors, "cached": cached}
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers=e.headers())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Logo generation failed: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    try:
+        job = await job_queue.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/logos")
 async def save_logo(logo: LogoProject):
     try:
-        logo_dict = logo.dict()
-        logos_collection.insert_one(logo_dict)
+        # Keep the image bytes in the blob store, only references in Mongo
+        image_bytes, content_type = decode_data_url(logo.image_data)
+        if logo.output is not None:
+            image_bytes, content_type = await run_in_process_pool(process_image, image_bytes, **logo.output.dict())
+        thumbnails = await run_in_process_pool(make_thumbnails, image_bytes)
+        image_sha256 = await asyncio.to_thread(blob_store.put, image_bytes)
+        thumbnail_digests = {}
+        for size, thumbnail_bytes in thumbnails.items():
+            thumbnail_digests[str(size)] = await asyncio.to_thread(blob_store.put, thumbnail_bytes)
+        
+        logo_dict = logo.dict(exclude={"image_data", "output"})
+        logo_dict.update(
+            image_sha256=image_sha256,
+            image_size=len(image_bytes),
+            image_content_type=content_type,
+            thumbnails=thumbnail_digests,
+        )
+        await logos_collection.insert_one(logo_dict)
         return {"message": "Logo saved successfully", "logo_id": logo.logo_id}
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Logo already exists")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def add_logo_urls(logo):
+    if "image_sha256" in logo:
+        logo["image_url"] = f"/api/logos/{logo['logo_id']}/image"
+        logo["thumbnail_urls"] = {
+            size: f"/api/logos/{logo['logo_id']}/image?size={size}"
+            for size in logo.get("thumbnails", {})
+        }
+    return logo
+
 @app.get("/api/logos")
-async def get_logos():
+async def get_logos(
+    raw_request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    name: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+):
     try:
-        logos = list(logos_collection.find({}, {"_id": 0}))
-        return {"logos": logos}
+        if sort not in LOGO_SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        logos, next_cursor = await fetch_page(
+            logos_collection,
+            filters=[
+                name_filter(name) if name else {},
+                range_filter("created_at", created_after, created_before),
+            ],
+            projection=parse_fields(fields, LOGO_FIELDS),
+            sort_field=sort,
+            id_field="logo_id",
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+        )
+        if wants_multipart(raw_request.headers.get("accept")):
+            images = []
+            for logo in logos:
+                if "image_sha256" in logo:
+                    image_bytes = await asyncio.to_thread(blob_store.get, logo["image_sha256"])
+                    images.append((logo["logo_id"], image_bytes, logo.get("image_content_type", "image/png")))
+                elif "image_data" in logo:
+                    images.append((logo["logo_id"], logo.pop("image_data")))
+            return multipart_response({"logos": logos, "next_cursor": next_cursor}, images)
+        return {"logos": [add_logo_urls(logo) for logo in logos], "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/logos/search")
+async def search_logos(
+    q: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+):
+    try:
+        # Ranked by text score over the name and prompt
+        logos, next_cursor = await search_page(
+            logos_collection,
+            q,
+            filters=[range_filter("created_at", created_after, created_before)],
+            projection=parse_fields(fields or LOGO_SEARCH_FIELDS, LOGO_FIELDS),
+            id_field="logo_id",
+            limit=limit,
+            cursor=cursor,
+        )
+        return {"logos": [add_logo_urls(logo) for logo in logos], "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/logos/{logo_id}/image")
+async def get_logo_image(logo_id: str, request: Request, size: Optional[int] = None):
+    try:
+        logo = await logos_collection.find_one(
+            {"logo_id": logo_id},
+            {"_id": 0, "image_sha256": 1, "image_content_type": 1, "thumbnails": 1, "image_data": 1},
+        )
+        if not logo:
+            raise HTTPException(status_code=404, detail="Logo not found")
+        
+        if "image_sha256" not in logo:
+            # Logos saved before the blob store still carry inline data
+            image_bytes, content_type = decode_data_url(logo["image_data"])
+            return Response(content=image_bytes, media_type=content_type)
+        
+        if size is None:
+            digest, content_type = logo["image_sha256"], logo.get("image_content_type", "image/png")
+        else:
+            digest = logo.get("thumbnails", {}).get(str(size))
+            if digest is None:
+                raise HTTPException(status_code=404, detail=f"No {size}px thumbnail for this logo")
+            content_type = "image/png"
+        return await blob_response(request, blob_store, digest, content_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Metrics
+@app.get("/api/metrics")
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Cache statistics
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return {"generation": generation_cache.stats(), "projects": project_cache.stats()}
+
 if __name__ == "__main__":
+    # Single-process development server; use serve.py in production
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
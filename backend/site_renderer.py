@@ -0,0 +1,176 @@
+import hashlib
+import os
+import re
+from html import escape
+
+from generation_cache import MemoryTier
+from imaging import decode_data_url
+
+# Extracted images are served from here; override when sites are
+# published behind a CDN or another host.
+SITE_ASSET_BASE_URL = os.getenv("SITE_ASSET_BASE_URL", "/api/sites/assets").rstrip("/")
+SITE_CACHE_SIZE = int(os.getenv("SITE_CACHE_SIZE", "256"))
+SITE_CACHE_MAX_BYTES = int(os.getenv("SITE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SITE_CACHE_TTL = int(os.getenv("SITE_CACHE_TTL", "86400"))
+
+ASSET_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+ASSET_CONTENT_TYPES = {extension: content_type for content_type, extension in ASSET_EXTENSIONS.items()}
+
+TEXT_TAGS = {"p", "span", "div", "blockquote", "small", "strong", "em"}
+SAFE_LINK_RE = re.compile(r"^(https?:|mailto:|tel:|#|/)", re.IGNORECASE)
+# CSS properties whose bare numbers must not get a px unit
+UNITLESS_PROPERTIES = {"font-weight", "line-height", "opacity", "z-index", "flex", "flex-grow", "flex-shrink", "order"}
+
+BASE_CSS = (
+    "body{font-family:system-ui,-apple-system,sans-serif;margin:0;padding:0}"
+    ".container{max-width:1200px;margin:0 auto;padding:20px}"
+    ".component{position:relative}"
+    ".component img{max-width:100%;height:auto}"
+    "form label{display:block;margin:8px 0 4px;text-transform:capitalize}"
+    "form input,form textarea{width:100%;box-sizing:border-box;padding:8px}"
+    "@media (max-width:768px){.container{padding:10px}}"
+)
+
+
+def _css_property(name):
+    return re.sub(r"([A-Z])", r"-\1", name).lower()
+
+
+def _css_value(property_name, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value) if property_name in UNITLESS_PROPERTIES or value == 0 else f"{value}px"
+    # Values cannot close the rule or the <style> element
+    return re.sub(r"[;{}<>]", "", str(value)).strip()
+
+
+def declarations(styles):
+    """Minified CSS declarations for a component's camelCase ``styles``."""
+    parts = []
+    for name, value in (styles or {}).items():
+        if value is None or value == "":
+            continue
+        property_name = _css_property(name)
+        if not re.fullmatch(r"-?[a-z][a-z-]*", property_name):
+            continue
+        parts.append(f"{property_name}:{_css_value(property_name, value)}")
+    return ";".join(parts)
+
+
+def parse_asset_name(name):
+    """Split ``<sha256>.<ext>`` into ``(digest, content_type)``."""
+    digest, _, extension = name.partition(".")
+    content_type = ASSET_CONTENT_TYPES.get(extension)
+    if content_type is None or not re.fullmatch(r"[0-9a-f]{64}", digest):
+        raise ValueError(f"Unknown asset {name}")
+    return digest, content_type
+
+
+def site_cache_key(project):
+    # updated_at guards against a deleted and recreated project reusing a version
+    return project["project_id"], project.get("version", 0), project.get("updated_at")
+
+
+def site_etag(key):
+    return '"site-' + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:16] + '"'
+
+
+def _link(href):
+    href = str(href or "#").strip()
+    return href if SAFE_LINK_RE.match(href) else "#"
+
+
+class SiteRenderer:
+    """Render stored projects to one minified, script-free HTML document.
+
+    Identical component styles collapse into one hashed class, so the
+    stylesheet stays small enough to inline in ``<head>``. Images stored
+    as data URLs are written to the blob store and referenced by content
+    hash, which makes their URLs safe to cache forever.
+    """
+
+    def __init__(self, blob_store, asset_base_url=SITE_ASSET_BASE_URL):
+        self.blob_store = blob_store
+        self.asset_base_url = asset_base_url
+
+    def _image_src(self, src):
+        if not src:
+            return ""
+        if not src.startswith("data:"):
+            return src
+        image_bytes, content_type = decode_data_url(src)
+        extension = ASSET_EXTENSIONS.get(content_type)
+        if extension is None:
+            raise ValueError(f"Unsupported image type {content_type}")
+        digest = self.blob_store.put(image_bytes)
+        return f"{self.asset_base_url}/{digest}.{extension}"
+
+    def _component_body(self, component):
+        props = component.get("props") or {}
+        kind = component.get("type")
+        if kind == "text":
+            tag = props.get("tag") if props.get("tag") in TEXT_TAGS else "p"
+            return f"<{tag}>{escape(str(props.get('content', '')))}</{tag}>"
+        if kind == "heading":
+            try:
+                level = min(6, max(1, int(props.get("level", 1))))
+            except (TypeError, ValueError):
+                level = 1
+            return f"<h{level}>{escape(str(props.get('content', '')))}</h{level}>"
+        if kind == "button":
+            return f'<a href="{escape(_link(props.get("link")))}">{escape(str(props.get("text", "")))}</a>'
+        if kind == "image":
+            src = self._image_src(props.get("src"))
+            if not src:
+                return ""
+            html = f'<img src="{escape(src)}" alt="{escape(str(props.get("alt", "")))}" loading="lazy">'
+            if props.get("caption"):
+                html = f"<figure>{html}<figcaption>{escape(str(props['caption']))}</figcaption></figure>"
+            return html
+        if kind == "section":
+            return (f"<section><h3>{escape(str(props.get('title', '')))}</h3>"
+                    f"<p>{escape(str(props.get('content', '')))}</p></section>")
+        if kind == "form":
+            fields = []
+            for index, field in enumerate(props.get("fields") or []):
+                field = str(field)
+                field_id = f"{component.get('id', 'form')}-{index}"
+                label = f'<label for="{escape(field_id)}">{escape(field)}</label>'
+                if field == "message":
+                    control = f'<textarea id="{escape(field_id)}" name="{escape(field)}" rows="3"></textarea>'
+                else:
+                    input_type = "email" if field == "email" else "text"
+                    control = f'<input id="{escape(field_id)}" name="{escape(field)}" type="{input_type}">'
+                fields.append(label + control)
+            return (f"<h3>{escape(str(props.get('title', '')))}</h3>"
+                    f"<form>{''.join(fields)}<button type=\"submit\">Submit</button></form>")
+        return ""
+
+    def render(self, project):
+        """Return the complete HTML document for ``project`` as bytes."""
+        classes = {}  # declarations -> class name
+        body = []
+        for component in project.get("components") or []:
+            css = declarations(component.get("styles"))
+            class_name = "component"
+            if css:
+                if css not in classes:
+                    classes[css] = "c" + hashlib.sha256(css.encode("utf-8")).hexdigest()[:8]
+                class_name += " " + classes[css]
+            body.append(f'<div class="{class_name}">{self._component_body(component)}</div>')
+
+        stylesheet = BASE_CSS + "".join(f".{name}{{{css}}}" for css, name in classes.items())
+        return (
+            '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+            '<meta name="viewport" content="width=device-width,initial-scale=1.0">'
+            f"<title>{escape(str(project.get('name', '')))}</title>"
+            f"<style>{stylesheet}</style></head>"
+            f'<body><div class="container">{"".join(body)}</div></body></html>'
+        ).encode("utf-8")
+
+
+site_cache = MemoryTier(SITE_CACHE_SIZE, SITE_CACHE_MAX_BYTES, SITE_CACHE_TTL, sizeof=len)
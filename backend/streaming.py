@@ -0,0 +1,67 @@
+import json
+
+from fastapi.responses import StreamingResponse
+
+from generation import iter_variants
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def negotiate_stream_format(accept):
+    """Pick ``"sse"``, ``"ndjson"`` or ``None`` (plain JSON) from an Accept header."""
+    accept = accept or ""
+    if SSE_MEDIA_TYPE in accept:
+        return "sse"
+    if NDJSON_MEDIA_TYPE in accept:
+        return "ndjson"
+    return None
+
+
+async def variant_events(model, prompt, count, transform=None):
+    """Generation events in completion order, ending with a ``done`` event.
+
+    ``transform`` is an optional coroutine applied to each image first.
+    """
+    index = 0
+    errors = []
+    async for images, error in iter_variants(model, prompt, count):
+        if error:
+            errors.append(error)
+            yield {"event": "error", "error": error}
+        for image in images:
+            if transform is not None:
+                image = await transform(image)
+            yield {"event": "image", "index": index, "image": image}
+            index += 1
+    yield {"event": "done", "count": index, "errors": errors, "cached": False}
+
+
+async def cached_events(images, transform=None):
+    for index, image in enumerate(images):
+        if transform is not None:
+            image = await transform(image)
+        yield {"event": "image", "index": index, "image": image}
+    yield {"event": "done", "count": len(images), "errors": [], "cached": True}
+
+
+def _encode(event, stream_format):
+    if stream_format == "sse":
+        payload = {key: value for key, value in event.items() if key != "event"}
+        return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(event) + "\n"
+
+
+def streaming_response(events, stream_format, **extra):
+    """Serialize an event stream; ``extra`` fields are added to every event."""
+    async def body():
+        async for event in events:
+            yield _encode({**event, **extra}, stream_format)
+
+    media_type = SSE_MEDIA_TYPE if stream_format == "sse" else NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        # Stop reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
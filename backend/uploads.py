@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import os
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from site_renderer import ASSET_EXTENSIONS
+
+ASSET_MAX_BYTES = int(os.getenv("ASSET_MAX_BYTES", str(10 * 1024 * 1024)))
+# Room for part headers and boundaries on top of the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Leading bytes of the image formats assets may have; the declared
+# content type of a part is not trusted.
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def sniff_content_type(head):
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class _FilePart:
+    """Receives one multipart file field, hashing and counting as it goes."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.file = open(path, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.pending = []
+
+    def feed(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"File is larger than {self.max_bytes} bytes")
+        if len(self.head) < 16:
+            self.head += data[:16 - len(self.head)]
+        self.hash.update(data)
+        self.pending.append(data)
+
+    def flush(self):
+        # Called once per received chunk, so at most one chunk is buffered
+        if self.pending:
+            self.file.write(b"".join(self.pending))
+            self.pending = []
+
+
+async def receive_asset(request, store, field="file", max_bytes=ASSET_MAX_BYTES):
+    """Stream the ``field`` file of a multipart request into ``store``.
+
+    The body is parsed as it arrives and written to a temporary file
+    chunk by chunk while its SHA-256 is computed, so memory use does not
+    depend on the file size and oversized uploads are rejected as soon as
+    they cross ``max_bytes``. Returns ``(digest, size, content_type, created)``.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"File is larger than {max_bytes} bytes")
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise ValueError("Expected a multipart/form-data upload")
+
+    state = {"headers": {}, "header_field": b"", "header_value": b"", "part": None, "current": None}
+    parts = []
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["current"] = None
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name") == field.encode() and state["part"] is None:
+            state["part"] = state["current"] = _FilePart(store.temp_path(), max_bytes)
+            parts.append(state["part"])
+
+    def on_part_data(data, start, end):
+        if state["current"] is not None:
+            state["current"].feed(data[start:end])
+
+    parser = MultipartParser(options[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if state["part"] is not None:
+                await asyncio.to_thread(state["part"].flush)
+        parser.finalize()
+        part = state["part"]
+        if part is None:
+            raise ValueError(f"No {field!r} file in the upload")
+        await asyncio.to_thread(part.flush)
+        part.file.close()
+        content_type = sniff_content_type(part.head)
+        if content_type not in ASSET_EXTENSIONS:
+            raise ValueError("Only PNG, JPEG, GIF and WebP images are accepted")
+        digest = part.hash.hexdigest()
+        created = await asyncio.to_thread(store.put_file, part.path, digest)
+        return digest, part.size, content_type, created
+    finally:
+        for part in parts:
+            part.file.close()
+            if os.path.exists(part.path):
+                os.remove(part.path)
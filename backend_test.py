@@ -8,6 +8,7 @@ import base64
 import os
 import sys
 from dotenv import load_dotenv
+from websockets.sync.client import connect
 
 # Load environment variables
 load_dotenv()
@@ -419,6 +420,614 @@ class TestBackendAPI(unittest.TestCase):
             print(f"❌ Exception during Error Handling test: {str(e)}")
             self.fail(f"Exception during test: {str(e)}")
 
+    def test_12_cache_stats(self):
+        """Test the generation cache statistics endpoint"""
+        print("\n12. Testing Cache Stats API...")
+        try:
+            response = requests.get(f"{self.base_url}/cache/stats")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                print(f"Response: {data}")
+                self.assertIn("generation", data)
+                for counter in ("memory_hits", "disk_hits", "misses", "hit_ratio"):
+                    self.assertIn(counter, data["generation"])
+                print("✅ Cache Stats API is working")
+            else:
+                print(f"❌ Cache Stats API failed with status code {response.status_code}")
+                print(f"Response: {response.text}")
+                self.fail(f"Cache Stats API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Cache Stats API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_13_paginated_projects(self):
+        """Test keyset pagination and field projection on the project list"""
+        print("\n13. Testing Paginated Projects API...")
+        try:
+            for i in range(3):
+                project = self.test_project.copy()
+                project["project_id"] = f"{self.test_project_id}-{i}"
+                requests.post(f"{self.base_url}/projects", json=project)
+            
+            response = requests.get(
+                f"{self.base_url}/projects",
+                params={"limit": 2, "fields": "project_id,name,updated_at"}
+            )
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                self.assertLessEqual(len(data["projects"]), 2)
+                self.assertIsNotNone(data["next_cursor"])
+                for project in data["projects"]:
+                    self.assertNotIn("components", project)
+                
+                next_page = requests.get(
+                    f"{self.base_url}/projects",
+                    params={"limit": 2, "cursor": data["next_cursor"]}
+                ).json()
+                first_ids = {p["project_id"] for p in data["projects"]}
+                self.assertFalse(first_ids & {p["project_id"] for p in next_page["projects"]})
+
+                # A cursor smuggling a query operator is rejected, not run
+                forged = base64.urlsafe_b64encode(json.dumps([{"$gt": ""}, "x"]).encode()).decode()
+                response = requests.get(f"{self.base_url}/projects", params={"cursor": forged})
+                self.assertEqual(response.status_code, 400)
+                print("✅ Paginated Projects API is working")
+            else:
+                print(f"❌ Paginated Projects API failed with status code {response.status_code}")
+                print(f"Response: {response.text}")
+                self.fail(f"Paginated Projects API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Paginated Projects API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+        finally:
+            for i in range(3):
+                requests.delete(f"{self.base_url}/projects/{self.test_project_id}-{i}")
+
+    def test_14_logo_image(self):
+        """Test streaming a saved logo image with ETag and Range support"""
+        print("\n14. Testing Logo Image API...")
+        try:
+            requests.post(f"{self.base_url}/logos", json=self.test_logo)
+            expected = base64.b64decode(self.test_logo["image_data"].split(",")[1])
+            
+            response = requests.get(f"{self.base_url}/logos/{self.test_logo_id}/image")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                self.assertEqual(response.content, expected)
+                etag = response.headers["ETag"]
+                
+                cached = requests.get(
+                    f"{self.base_url}/logos/{self.test_logo_id}/image",
+                    headers={"If-None-Match": etag}
+                )
+                self.assertEqual(cached.status_code, 304)
+                
+                partial = requests.get(
+                    f"{self.base_url}/logos/{self.test_logo_id}/image",
+                    headers={"Range": "bytes=0-7"}
+                )
+                self.assertEqual(partial.status_code, 206)
+                self.assertEqual(partial.content, expected[:8])
+                print("✅ Logo Image API is working")
+            else:
+                print(f"❌ Logo Image API failed with status code {response.status_code}")
+                print(f"Response: {response.text}")
+                self.fail(f"Logo Image API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Logo Image API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_15_patch_project(self):
+        """Test incremental component patches with optimistic concurrency"""
+        print("\n15. Testing Patch Project API...")
+        try:
+            project = self.test_project.copy()
+            project["components"] = [
+                {"id": "c1", "type": "heading", "content": "Welcome"},
+                {"id": "c2", "type": "text", "content": "Hello"}
+            ]
+            requests.post(f"{self.base_url}/projects", json=project)
+            version = requests.get(f"{self.base_url}/projects/{self.test_project_id}").json()["version"]
+            
+            response = requests.patch(
+                f"{self.base_url}/projects/{self.test_project_id}",
+                json={
+                    "version": version,
+                    "operations": [
+                        {"op": "insert", "index": 1, "component": {"id": "c3", "type": "button"}},
+                        {"op": "update", "id": "c2", "fields": {"content": "Updated"}},
+                        {"op": "move", "id": "c1", "to": 2}
+                    ]
+                }
+            )
+            print(f"Status Code: {response.status_code}")
+            print(f"Response: {response.text}")
+            
+            if response.status_code == 200:
+                self.assertEqual(response.json()["version"], version + 1)
+                data = requests.get(f"{self.base_url}/projects/{self.test_project_id}").json()
+                self.assertEqual([c["id"] for c in data["components"]], ["c3", "c2", "c1"])
+                self.assertEqual(data["components"][1]["content"], "Updated")
+                
+                stale = requests.patch(
+                    f"{self.base_url}/projects/{self.test_project_id}",
+                    json={"version": version, "operations": [{"op": "remove", "id": "c1"}]}
+                )
+                self.assertEqual(stale.status_code, 409)
+                print("✅ Patch Project API is working")
+            else:
+                print(f"❌ Patch Project API failed with status code {response.status_code}")
+                self.fail(f"Patch Project API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Patch Project API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+        finally:
+            requests.delete(f"{self.base_url}/projects/{self.test_project_id}")
+
+    def test_16_generation_job(self):
+        """Test queueing a background generation job and polling its status"""
+        print("\n16. Testing Generation Job API...")
+        try:
+            response = requests.post(
+                f"{self.base_url}/generate-image",
+                json={"prompt": "A beautiful sunset over mountains", "count": 1, "background": True}
+            )
+            print(f"Status Code: {response.status_code}")
+            print(f"Response: {response.text}")
+            
+            if response.status_code == 202:
+                job_id = response.json()["job_id"]
+                status = None
+                for _ in range(60):
+                    job = requests.get(f"{self.base_url}/jobs/{job_id}").json()
+                    status = job["status"]
+                    if status in ("succeeded", "failed"):
+                        break
+                    time.sleep(1)
+                print(f"Final job status: {status}")
+                self.assertIn(status, ("succeeded", "failed"))
+                if status == "succeeded":
+                    self.assertIn("images", job["result"])
+                print("✅ Generation Job API is working")
+            else:
+                print(f"❌ Generation Job API failed with status code {response.status_code}")
+                self.fail(f"Generation Job API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Generation Job API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_17_metrics(self):
+        """Test the Prometheus metrics endpoint"""
+        print("\n17. Testing Metrics API...")
+        try:
+            requests.get(f"{self.base_url}/health")
+            response = requests.get(f"{self.base_url}/metrics")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+                self.assertIn('http_requests_total{method="GET",route="/api/health",status="200"}', response.text)
+                self.assertIn("http_request_duration_seconds_bucket", response.text)
+                print("✅ Metrics API is working")
+            else:
+                print(f"❌ Metrics API failed with status code {response.status_code}")
+                self.fail(f"Metrics API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Metrics API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_18_bulk_projects(self):
+        """Test bulk project import and NDJSON export"""
+        print("\n18. Testing Bulk Projects API...")
+        try:
+            prefix = f"bulk-{uuid.uuid4()}"
+            now = datetime.now().isoformat()
+            projects = [
+                {"project_id": f"{prefix}-{i}", "name": f"Bulk {i}", "components": [],
+                 "created_at": now, "updated_at": now}
+                for i in range(3)
+            ]
+            projects.append({"project_id": f"{prefix}-invalid"})
+            response = requests.post(f"{self.base_url}/projects/bulk", json={"projects": projects})
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                self.assertEqual(data["written"], 3)
+                self.assertEqual(data["failed"], 1)
+                self.assertEqual(data["errors"][0]["index"], 3)
+                
+                response = requests.get(f"{self.base_url}/projects/export", params={"updated_after": now})
+                self.assertEqual(response.status_code, 200)
+                exported = [json.loads(line) for line in response.text.splitlines()]
+                self.assertTrue({f"{prefix}-{i}" for i in range(3)} <= {p["project_id"] for p in exported})
+                
+                for i in range(3):
+                    requests.delete(f"{self.base_url}/projects/{prefix}-{i}")
+                print("✅ Bulk Projects API is working")
+            else:
+                print(f"❌ Bulk Projects API failed with status code {response.status_code}")
+                self.fail(f"Bulk Projects API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Bulk Projects API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_19_project_etag(self):
+        """Test conditional GET of a project with ETag/If-None-Match"""
+        print("\n19. Testing Project ETag...")
+        try:
+            project_id = str(uuid.uuid4())
+            project = dict(self.test_project, project_id=project_id)
+            requests.post(f"{self.base_url}/projects", json=project)
+            response = requests.get(f"{self.base_url}/projects/{project_id}")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                etag = response.headers["ETag"]
+                response = requests.get(f"{self.base_url}/projects/{project_id}", headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+                
+                # An update must invalidate the cached copy and change the ETag
+                project["name"] = "Renamed Project"
+                requests.put(f"{self.base_url}/projects/{project_id}", json=project)
+                response = requests.get(f"{self.base_url}/projects/{project_id}", headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response.headers["ETag"], etag)
+                self.assertEqual(response.json()["name"], "Renamed Project")
+                
+                # A project recreated under the same id starts again at
+                # version 0 and must not match the old ETag
+                etag = response.headers["ETag"]
+                requests.delete(f"{self.base_url}/projects/{project_id}")
+                requests.post(f"{self.base_url}/projects", json=dict(project, name="Recreated Project"))
+                response = requests.get(f"{self.base_url}/projects/{project_id}", headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["name"], "Recreated Project")
+                
+                requests.delete(f"{self.base_url}/projects/{project_id}")
+                print("✅ Project ETag is working")
+            else:
+                print(f"❌ Project ETag failed with status code {response.status_code}")
+                self.fail(f"Project ETag failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Project ETag test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_20_project_site(self):
+        """Test static HTML rendering of a project"""
+        print("\n20. Testing Project Site API...")
+        try:
+            project_id = str(uuid.uuid4())
+            project = dict(self.test_project, project_id=project_id)
+            requests.post(f"{self.base_url}/projects", json=project)
+            response = requests.get(f"{self.base_url}/projects/{project_id}/site")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/html"))
+                self.assertIn("<!DOCTYPE html>", response.text)
+                self.assertNotIn("<script", response.text)
+                
+                etag = response.headers["ETag"]
+                response = requests.get(
+                    f"{self.base_url}/projects/{project_id}/site", headers={"If-None-Match": etag}
+                )
+                self.assertEqual(response.status_code, 304)
+                
+                requests.delete(f"{self.base_url}/projects/{project_id}")
+                print("✅ Project Site API is working")
+            else:
+                print(f"❌ Project Site API failed with status code {response.status_code}")
+                self.fail(f"Project Site API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Project Site API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_21_readiness(self):
+        """Test the liveness and readiness endpoints"""
+        print("\n21. Testing Liveness and Readiness...")
+        try:
+            response = requests.get(f"{self.base_url}/health/live")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                self.assertEqual(response.json()["status"], "alive")
+                response = requests.get(f"{self.base_url}/health/ready")
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertEqual(data["status"], "ready")
+                self.assertEqual(data["checks"]["mongo"], "ok")
+                self.assertEqual(data["checks"]["gemini"], "ok")
+                print("✅ Liveness and Readiness are working")
+            else:
+                print(f"❌ Liveness failed with status code {response.status_code}")
+                self.fail(f"Liveness failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Readiness test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_22_revisions(self):
+        """Test listing and restoring project revisions"""
+        print("\n22. Testing Project Revisions API...")
+        try:
+            project_id = str(uuid.uuid4())
+            project = dict(self.test_project, project_id=project_id)
+            requests.post(f"{self.base_url}/projects", json=project)
+            updated = dict(project, components=[])
+            requests.put(f"{self.base_url}/projects/{project_id}", json=updated)
+            response = requests.get(f"{self.base_url}/projects/{project_id}/revisions")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                versions = [revision["version"] for revision in response.json()["revisions"]]
+                self.assertEqual(versions, [1, 0])
+                
+                response = requests.get(f"{self.base_url}/projects/{project_id}/revisions/0")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["components"], project["components"])
+                
+                response = requests.post(f"{self.base_url}/projects/{project_id}/revisions/0/restore")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["version"], 2)
+                restored = requests.get(f"{self.base_url}/projects/{project_id}").json()
+                self.assertEqual(restored["components"], project["components"])
+                
+                requests.delete(f"{self.base_url}/projects/{project_id}")
+                print("✅ Project Revisions API is working")
+            else:
+                print(f"❌ Project Revisions API failed with status code {response.status_code}")
+                self.fail(f"Project Revisions API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Project Revisions API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_23_upload_asset(self):
+        """Test streaming image asset upload"""
+        print("\n23. Testing Asset Upload API...")
+        try:
+            # 1x1 transparent PNG
+            png = base64.b64decode(
+                "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+            )
+            response = requests.post(f"{self.base_url}/assets", files={"file": ("pixel.png", png, "image/png")})
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code in (200, 201):
+                data = response.json()
+                self.assertEqual(data["content_type"], "image/png")
+                self.assertEqual(data["size"], len(png))
+                
+                response = requests.get(f"{BACKEND_URL}{data['url']}")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, png)
+                
+                response = requests.post(f"{self.base_url}/assets", files={"file": ("page.html", b"<html></html>", "image/png")})
+                self.assertEqual(response.status_code, 400)
+                print("✅ Asset Upload API is working")
+            else:
+                print(f"❌ Asset Upload API failed with status code {response.status_code}")
+                self.fail(f"Asset Upload API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Asset Upload API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_24_live_editing(self):
+        """Test the live editing WebSocket"""
+        print("\n24. Testing Live Editing API...")
+        try:
+            project_id = str(uuid.uuid4())
+            requests.post(f"{self.base_url}/projects", json=dict(self.test_project, project_id=project_id))
+            url = BACKEND_URL.replace("http", "ws", 1) + f"/api/projects/{project_id}/live"
+            with connect(url) as first, connect(url) as second:
+                hello = json.loads(first.recv())
+                json.loads(second.recv())
+                self.assertEqual(hello["type"], "hello")
+                component = {"id": "live-text", "type": "text", "props": {"content": "Live"}}
+                first.send(json.dumps({"type": "ops", "client_seq": 1, "operations": [{"op": "insert", "component": component}]}))
+                ack = json.loads(first.recv())
+                self.assertEqual(ack["type"], "ack")
+                broadcast = json.loads(second.recv())
+                self.assertEqual(broadcast["type"], "ops")
+                self.assertEqual(broadcast["operations"][0]["component"], component)
+                
+                first.send(json.dumps({"type": "ops", "client_seq": 2, "operations": [{"op": "remove", "id": "missing"}]}))
+                self.assertEqual(json.loads(first.recv())["type"], "error")
+                
+                first.send(json.dumps({"type": "save"}))
+                self.assertEqual(json.loads(first.recv())["type"], "saved")
+                self.assertEqual(json.loads(second.recv())["type"], "saved")
+            
+            response = requests.get(f"{self.base_url}/projects/{project_id}")
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                self.assertEqual(response.json()["components"][-1], component)
+                requests.delete(f"{self.base_url}/projects/{project_id}")
+                print("✅ Live Editing API is working")
+            else:
+                print(f"❌ Live Editing API failed with status code {response.status_code}")
+                self.fail(f"Live Editing API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Live Editing API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_25_search(self):
+        """Test ranked project search"""
+        print("\n25. Testing Search API...")
+        try:
+            word = f"zebra{uuid.uuid4().hex[:8]}"
+            by_name = dict(self.test_project, project_id=str(uuid.uuid4()), name=f"{word} studio")
+            by_content = dict(self.test_project, project_id=str(uuid.uuid4()), name="Other", components=[
+                {"id": "c1", "type": "text", "props": {"content": f"All about {word}"}},
+            ])
+            for project in (by_content, by_name):
+                requests.post(f"{self.base_url}/projects", json=project)
+            response = requests.get(f"{self.base_url}/projects/search", params={"q": word})
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code == 200:
+                results = response.json()["projects"]
+                # Name matches outrank component text matches
+                self.assertEqual([project["project_id"] for project in results],
+                                 [by_name["project_id"], by_content["project_id"]])
+                self.assertGreater(results[0]["score"], results[1]["score"])
+                
+                page = requests.get(f"{self.base_url}/projects/search", params={"q": word, "limit": 1}).json()
+                self.assertIsNotNone(page["next_cursor"])
+                page = requests.get(f"{self.base_url}/projects/search",
+                                    params={"q": word, "limit": 1, "cursor": page["next_cursor"]}).json()
+                self.assertEqual(page["projects"][0]["project_id"], by_content["project_id"])
+                
+                response = requests.get(f"{self.base_url}/projects/search", params={"q": " "})
+                self.assertEqual(response.status_code, 400)
+                for project in (by_content, by_name):
+                    requests.delete(f"{self.base_url}/projects/{project['project_id']}")
+                print("✅ Search API is working")
+            else:
+                print(f"❌ Search API failed with status code {response.status_code}")
+                self.fail(f"Search API failed with status code {response.status_code}")
+        except Exception as e:
+            print(f"❌ Exception during Search API test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_26_startup_budget(self):
+        """Test that the API process imports and starts within budget"""
+        print("\n26. Testing Startup Budget...")
+        try:
+            sys.path.insert(0, '/app/backend/benchmarks')
+            import bench_cold_start
+            
+            import_budget = float(os.getenv('STARTUP_IMPORT_BUDGET_MS', '1000'))
+            ready_budget = float(os.getenv('STARTUP_READY_BUDGET', '5'))
+            modules = bench_cold_start.import_profile()
+            names = {name for name, _, _ in modules}
+            print(f"Import time: {modules[-1][1] / 1000:.1f} ms")
+            # The Gemini SDK and PIL are loaded on first use
+            for name in bench_cold_start.LAZY_MODULES:
+                self.assertNotIn(name, names)
+            
+            if bench_cold_start.run_import(import_budget, 5) and bench_cold_start.run(1, ready_budget, 60):
+                print("✅ Startup is within budget")
+            else:
+                print(f"❌ Startup exceeded its budget ({import_budget:.0f} ms import, {ready_budget:.1f} s ready)")
+                self.fail(f"Startup exceeded its budget ({import_budget:.0f} ms import, {ready_budget:.1f} s ready)")
+        except Exception as e:
+            print(f"❌ Exception during Startup Budget test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_27_generation_batching(self):
+        """Test multi-candidate generation against a stub that counts upstream calls"""
+        print("\n27. Testing Generation Batching...")
+        try:
+            sys.path.insert(0, '/app/backend')
+            sys.path.insert(0, '/app/backend/benchmarks')
+            import asyncio
+            import generation
+            from fake_gemini import FakeGenerativeModel
+            
+            async def generate(model, count, backend=None):
+                generation._global_limiter = asyncio.Semaphore(generation.GENERATION_GLOBAL_CONCURRENCY)
+                if backend:
+                    generation._backends[model] = backend
+                return await generation.generate_variants(model, "test prompt", count)
+            
+            # 8 variants at 4 candidates per call take two calls
+            model = FakeGenerativeModel(latency=0.05)
+            images, errors = asyncio.run(generate(model, 8, generation.GenerationBackend(model, 4)))
+            self.assertEqual((len(images), errors, model.calls), (8, [], 2))
+            
+            # A model that rejects candidate_count: one rejected call, then
+            # single calls from then on
+            model = FakeGenerativeModel(latency=0.05, max_candidates=1)
+            backend = generation.GenerationBackend(model, 4)
+            images, errors = asyncio.run(generate(model, 4, backend))
+            self.assertEqual((len(images), errors, model.calls), (4, [], 5))
+            self.assertEqual(backend.max_candidates, 1)
+            images, errors = asyncio.run(generate(model, 4))
+            self.assertEqual((len(images), model.calls), (4, 9))
+            
+            # Failed fallback calls are reported, so the short result is
+            # not cached
+            model = FakeGenerativeModel(latency=0.05, max_candidates=1, failure_rate=1 / 3)
+            images, errors = asyncio.run(generate(model, 4, generation.GenerationBackend(model, 4)))
+            self.assertEqual((len(images), len(errors)), (3, 1))
+            
+            # Identical concurrent requests share one generation
+            model = FakeGenerativeModel(latency=0.2)
+            async def burst():
+                generation._global_limiter = asyncio.Semaphore(generation.GENERATION_GLOBAL_CONCURRENCY)
+                return await asyncio.gather(*(
+                    generation.coalesce("test-key", lambda: generation.generate_variants(model, "test prompt", 4))
+                    for _ in range(10)
+                ))
+            results = asyncio.run(burst())
+            self.assertTrue(all(len(images) == 4 for images, _ in results))
+            self.assertEqual(model.calls, 1)
+            
+            with self.assertRaises(ValueError):
+                generation.GenerationBackend(model).plan(0)
+            for count in (-1, 0, None, generation.GENERATION_MAX_VARIANTS + 1):
+                response = requests.post(f"{self.base_url}/generate-image", json={"prompt": "test", "count": count})
+                print(f"Status Code: {response.status_code}")
+                self.assertEqual(response.status_code, 422)
+            print("✅ Generation batching is working")
+        except Exception as e:
+            print(f"❌ Exception during Generation Batching test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
+    def test_28_rate_limiting(self):
+        """Test generation rate limiting and load shedding"""
+        print("\n28. Testing Rate Limiting...")
+        try:
+            sys.path.insert(0, '/app/backend')
+            import generation
+            from ratelimit import RateLimited, RateLimiter
+            
+            now = [0.0]
+            limiter = RateLimiter(client_rate=1, client_burst=8, global_rate=10, global_burst=12,
+                                  clock=lambda: now[0])
+            limiter.acquire("a", 8)
+            with self.assertRaises(RateLimited) as raised:
+                limiter.acquire("a", 4)
+            # Retry-After is when the bucket will hold 4 tokens again
+            self.assertEqual(raised.exception.headers(), {"Retry-After": "4"})
+            now[0] += 4
+            limiter.acquire("a", 4)
+            
+            # Another client has its own bucket, until the global one is empty
+            limiter.acquire("b", 4)
+            with self.assertRaises(RateLimited) as raised:
+                limiter.acquire("c", 8)
+            self.assertIn("global", str(raised.exception))
+            self.assertLessEqual(raised.exception.retry_after, 3600)
+            # Queued jobs spend only the client's own tokens
+            limiter.acquire("d", 8, charge_global=False)
+            with self.assertRaises(RateLimited):
+                limiter.acquire("d", 1, charge_global=False)
+            
+            # A full Gemini backlog sheds new requests
+            generation._pending_calls = generation.GENERATION_MAX_PENDING
+            try:
+                with self.assertRaises(RateLimited):
+                    generation.admit(1)
+            finally:
+                generation._pending_calls = 0
+            generation.admit(1)
+            
+            # More variants than a client may ever spend is a 422, not a 429
+            response = requests.post(f"{self.base_url}/generate-image", json={"prompt": "test", "count": 9})
+            print(f"Status Code: {response.status_code}")
+            self.assertEqual(response.status_code, 422)
+            print("✅ Rate limiting is working")
+        except Exception as e:
+            print(f"❌ Exception during Rate Limiting test: {str(e)}")
+            self.fail(f"Exception during test: {str(e)}")
+
 
 if __name__ == "__main__":
     # Run the tests
@@ -440,6 +1049,23 @@ if __name__ == "__main__":
     suite.addTest(TestBackendAPI('test_09_get_logos'))
     suite.addTest(TestBackendAPI('test_10_delete_project'))
     suite.addTest(TestBackendAPI('test_11_error_handling'))
+    suite.addTest(TestBackendAPI('test_12_cache_stats'))
+    suite.addTest(TestBackendAPI('test_13_paginated_projects'))
+    suite.addTest(TestBackendAPI('test_14_logo_image'))
+    suite.addTest(TestBackendAPI('test_15_patch_project'))
+    suite.addTest(TestBackendAPI('test_16_generation_job'))
+    suite.addTest(TestBackendAPI('test_17_metrics'))
+    suite.addTest(TestBackendAPI('test_18_bulk_projects'))
+    suite.addTest(TestBackendAPI('test_19_project_etag'))
+    suite.addTest(TestBackendAPI('test_20_project_site'))
+    suite.addTest(TestBackendAPI('test_21_readiness'))
+    suite.addTest(TestBackendAPI('test_22_revisions'))
+    suite.addTest(TestBackendAPI('test_23_upload_asset'))
+    suite.addTest(TestBackendAPI('test_24_live_editing'))
+    suite.addTest(TestBackendAPI('test_25_search'))
+    suite.addTest(TestBackendAPI('test_26_startup_budget'))
+    suite.addTest(TestBackendAPI('test_27_generation_batching'))
+    suite.addTest(TestBackendAPI('test_28_rate_limiting'))
     
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -101,6 +101,13 @@ const LogoGenerator = () => {
     }
   };
 
+  // Saved logos are served from the blob store; fall back to inline data
+  const logoSrc = (logo, size) => {
+    if (!logo.image_url) return logo.image_data;
+    const path = (size && logo.thumbnail_urls?.[size]) || logo.image_url;
+    return `${process.env.REACT_APP_BACKEND_URL}${path}`;
+  };
+
   const downloadLogo = (logoData, index) => {
     const link = document.createElement('a');
     link.href = logoData;
@@ -140,11 +147,18 @@ const LogoGenerator = () => {
 
   const loadSavedLogos = async () => {
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/logos`);
-      if (response.ok) {
+      const loaded = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ limit: '200' });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/logos?${params}`);
+        if (!response.ok) break;
         const data = await response.json();
-        setSavedLogos(data.logos);
-      }
+        loaded.push(...data.logos);
+        cursor = data.next_cursor;
+      } while (cursor);
+      setSavedLogos(loaded);
     } catch (error) {
       console.error('Error loading saved logos:', error);
     }
@@ -351,7 +365,7 @@ const LogoGenerator = () => {
               >
                 <div className="aspect-square bg-white flex items-center justify-center p-4">
                   <img
-                    src={logo.image_data}
+                    src={logoSrc(logo, 256)}
                     alt={logo.name}
                     className="max-w-full max-h-full object-contain"
                   />
@@ -362,7 +376,7 @@ const LogoGenerator = () => {
                     {new Date(logo.created_at).toLocaleDateString()}
                   </p>
                   <button
-                    onClick={() => downloadLogo(logo.image_data, index)}
+                    onClick={() => downloadLogo(logoSrc(logo), index)}
                     className="w-full px-3 py-2 bg-slate-100 text-slate-700 rounded-md hover:bg-slate-200 transition-colors flex items-center justify-center space-x-1"
                   >
                     <Download size={16} />
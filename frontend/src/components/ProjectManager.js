@@ -12,16 +12,35 @@ const ProjectManager = ({ currentProject, onLoadProject, onNewProject }) => {
 
   const loadProjects = async () => {
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects`);
-      if (response.ok) {
+      // The list only needs summary fields; components are fetched on open
+      const loaded = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ fields: 'project_id,name,updated_at', limit: '200' });
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects?${params}`);
+        if (!response.ok) break;
         const data = await response.json();
-        setProjects(data.projects);
-      }
+        loaded.push(...data.projects);
+        cursor = data.next_cursor;
+      } while (cursor);
+      setProjects(loaded);
     } catch (error) {
       console.error('Error loading projects:', error);
     }
   };
 
+  const openProject = async (projectId) => {
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects/${projectId}`);
+      if (response.ok) {
+        onLoadProject(await response.json());
+      }
+    } catch (error) {
+      console.error('Error loading project:', error);
+    }
+  };
+
   const createProject = async () => {
     if (!newProjectName.trim()) return;
 
@@ -43,7 +62,7 @@ const ProjectManager = ({ currentProject, onLoadProject, onNewProject }) => {
       });
 
       if (response.ok) {
-        setProjects(prev => [...prev, newProject]);
+        setProjects(prev => [newProject, ...prev]);
         setShowCreateModal(false);
         setNewProjectName('');
         onNewProject(newProject);
@@ -91,7 +110,7 @@ const ProjectManager = ({ currentProject, onLoadProject, onNewProject }) => {
                 ? 'border-primary-500 bg-primary-50'
                 : 'border-slate-200 hover:border-slate-300'
             }`}
-            onClick={() => onLoadProject(project)}
+            onClick={() => openProject(project.project_id)}
           >
             <div className="flex items-center justify-between">
               <div className="flex items-center space-x-3">
@@ -39,7 +39,7 @@ const WebsiteBuilder = () => {
         updated_at: new Date().toISOString()
       };
 
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects`, {
+      let response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -47,6 +47,17 @@ const WebsiteBuilder = () => {
         body: JSON.stringify(projectData),
       });
 
+      // Already saved once: update it in place
+      if (response.status === 409) {
+        response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects/${projectData.project_id}`, {
+          method: 'PUT',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(projectData),
+        });
+      }
+
       if (response.ok) {
         alert('Project saved successfully!');
       } else {
@@ -349,6 +360,27 @@ const ComponentProperties = ({ component, onUpdate }) => {
     onUpdate({ props: { ...component.props, [key]: value } });
   };
 
+  // Store uploads as assets so projects keep a URL instead of inline data
+  const uploadImage = async (file) => {
+    try {
+      const formData = new FormData();
+      formData.append('file', file);
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/assets`, {
+        method: 'POST',
+        body: formData,
+      });
+      if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Upload failed');
+      }
+      const asset = await response.json();
+      updateProp('src', `${process.env.REACT_APP_BACKEND_URL}${asset.url}`);
+    } catch (error) {
+      console.error('Error uploading image:', error);
+      alert(`Error uploading image: ${error.message}`);
+    }
+  };
+
   const updateStyle = (key, value) => {
     onUpdate({ styles: { ...component.styles, [key]: value } });
   };
@@ -465,6 +497,17 @@ const ComponentProperties = ({ component, onUpdate }) => {
               className="w-full px-3 py-2 border border-slate-300 rounded-md focus:ring-2 focus:ring-primary-500 focus:border-transparent"
             />
           </div>
+          <div>
+            <label className="block text-sm font-medium text-slate-700 mb-2">
+              Upload Image
+            </label>
+            <input
+              type="file"
+              accept="image/png,image/jpeg,image/gif,image/webp"
+              onChange={(e) => e.target.files[0] && uploadImage(e.target.files[0])}
+              className="w-full text-sm text-slate-700"
+            />
+          </div>
           <div>
             <label className="block text-sm font-medium text-slate-700 mb-2">
               Alt Text